@@ -0,0 +1,290 @@
+// clientside mode of the games dashboard: the metrics, the stacked area plot and the bar chart
+// are computed in the browser from the compact dataset sent once in the 'games-data' store
+(function () {
+    var typedArrays = {
+        '<u1': Uint8Array,
+        '<u2': Uint16Array,
+        '<i2': Int16Array,
+        '<f4': Float32Array
+    };
+
+    // read a base64 column back as a typed array
+    function decodeColumn(column) {
+        var binary = atob(column.data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new typedArrays[column.dtype](bytes.buffer);
+    }
+
+    // the columns are decoded again only when the store data are replaced by a new data version
+    var decodedData = null;
+    var decodedColumns = null;
+
+    function getColumns(data) {
+        if (decodedData !== data) {
+            decodedColumns = {};
+            Object.keys(data.columns).forEach(function (name) {
+                decodedColumns[name] = decodeColumn(data.columns[name]);
+            });
+            decodedData = data;
+        }
+        return decodedColumns;
+    }
+
+    // return a flag for every value of a dimension, empty selections select all values
+    function selectedFlags(values, selectedValues) {
+        var all = !selectedValues || selectedValues.length === 0;
+        if (typeof selectedValues === 'string') {
+            selectedValues = [selectedValues];
+        }
+        return values.map(function (value) {
+            return all || selectedValues.indexOf(value) !== -1;
+        });
+    }
+
+    // round half to even, as numpy's rint does
+    function rint(value) {
+        var rounded = Math.round(value);
+        return rounded - value === 0.5 && rounded % 2 !== 0 ? rounded - 1 : rounded;
+    }
+
+    // sum the values in the order of numpy's pairwise summation, which pandas uses for the mean of a column
+    function pairwiseSum(values, start, length) {
+        var i;
+        var sum;
+        if (length < 8) {
+            sum = -0.0;
+            for (i = 0; i < length; i++) {
+                sum += values[start + i];
+            }
+            return sum;
+        }
+        if (length <= 128) {
+            var partialSums = Array.prototype.slice.call(values, start, start + 8);
+            for (i = 8; i < length - length % 8; i += 8) {
+                for (var j = 0; j < 8; j++) {
+                    partialSums[j] += values[start + i + j];
+                }
+            }
+            sum = ((partialSums[0] + partialSums[1]) + (partialSums[2] + partialSums[3]))
+                + ((partialSums[4] + partialSums[5]) + (partialSums[6] + partialSums[7]));
+            for (; i < length; i++) {
+                sum += values[start + i];
+            }
+            return sum;
+        }
+        var half = Math.floor(length / 2);
+        half -= half % 8;
+        return pairwiseSum(values, start, half) + pairwiseSum(values, start + half, length - half);
+    }
+
+    // round a score to 2 decimals as round() does on the numpy float of the server: the score times 100
+    // is rounded half to even
+    function roundScore(score) {
+        return rint(score * 100) / 100;
+    }
+
+    // return the mean of a column summed as integers scaled by scale, rounded to 2 decimals as
+    // CubeSlice.rounded_total does on the server: a mean halfway between two rounded values is computed
+    // as pandas computes the mean of the values of the selected rows, returned in their order by getValues
+    function roundedMean(sum, count, scale, getValues) {
+        var numerator = sum * 100;
+        var denominator = count * scale;
+        if (denominator > 0 && (2 * numerator) % (2 * denominator) === denominator) {
+            var values = getValues();
+            return roundScore(pairwiseSum(values, 0, values.length) / count);
+        }
+        return roundScore(sum / denominator);
+    }
+
+    // format a rounded score as str() does on the server
+    function formatScore(score) {
+        if (isNaN(score)) {
+            return 'nan';
+        }
+        return Number.isInteger(score) ? score.toFixed(1) : String(score);
+    }
+
+    function copyFigure(figure) {
+        return JSON.parse(JSON.stringify(figure));
+    }
+
+    function stackedAreaPlot(data, startYear, counts) {
+        var figure = copyFigure(data.figures.area);
+        var platformsNumber = data.platforms.length;
+        var yearsNumber = counts.length / platformsNumber;
+        // platforms in the order of their first year with games, as the server builds the traces
+        var platformOrder = [];
+        for (var year = 0; year < yearsNumber; year++) {
+            for (var platform = 0; platform < platformsNumber; platform++) {
+                if (counts[platform * yearsNumber + year] > 0 && platformOrder.indexOf(platform) === -1) {
+                    platformOrder.push(platform);
+                }
+            }
+        }
+        figure.data = platformOrder.map(function (platform) {
+            var name = data.platforms[platform];
+            var x = [];
+            var y = [];
+            for (var year = 0; year < yearsNumber; year++) {
+                if (counts[platform * yearsNumber + year] > 0) {
+                    x.push(startYear + year);
+                    y.push(counts[platform * yearsNumber + year]);
+                }
+            }
+            return {
+                type: 'scatter',
+                x: x,
+                y: y,
+                name: name,
+                legendgroup: name,
+                line: {color: data.platform_colors[name]},
+                marker: {symbol: 'circle'},
+                mode: 'lines+markers',
+                stackgroup: '1',
+                fillpattern: {shape: ''},
+                orientation: 'v',
+                showlegend: true,
+                hovertemplate: 'Platform=' + name + '<br>Year of release=%{x}<br>Number of games=%{y}<extra></extra>',
+                xaxis: 'x',
+                yaxis: 'y'
+            };
+        });
+        return figure;
+    }
+
+    function barChart(data, genreCounts, ageRatingSums, ageRatingCounts) {
+        var figure = copyFigure(data.figures.bar);
+        var averageAgeRatings = [];
+        for (var genre = 0; genre < data.genres.length; genre++) {
+            if (genreCounts[genre] > 0) {
+                averageAgeRatings.push({genre: data.genres[genre],
+                                        index: genre,
+                                        ageRating: ageRatingSums[genre]
+                                            / (ageRatingCounts[genre] * data.scales.age_rating)});
+            }
+        }
+        // sorted as the server sorts the genres, whose stable sort keeps equal averages in the order
+        // of the genres and puts the genres without an age rating last
+        averageAgeRatings.sort(function (first, second) {
+            if (isNaN(first.ageRating) || isNaN(second.ageRating)) {
+                return isNaN(first.ageRating) - isNaN(second.ageRating) || first.index - second.index;
+            }
+            return first.ageRating - second.ageRating || first.index - second.index;
+        });
+        figure.data = averageAgeRatings.map(function (averageAgeRating) {
+            var name = averageAgeRating.genre;
+            var ageRating = Math.trunc(averageAgeRating.ageRating);
+            return {
+                type: 'bar',
+                x: [name],
+                y: [ageRating],
+                text: [ageRating],
+                textposition: 'auto',
+                name: name,
+                legendgroup: name,
+                offsetgroup: name,
+                alignmentgroup: 'True',
+                marker: {color: data.genre_colors[name], pattern: {shape: ''}},
+                orientation: 'v',
+                showlegend: true,
+                hovertemplate: 'Genre=%{x}<br>Age=%{text}<extra></extra>',
+                xaxis: 'x',
+                yaxis: 'y'
+            };
+        });
+        figure.layout.xaxis.categoryarray = averageAgeRatings.map(function (averageAgeRating) {
+            return averageAgeRating.genre;
+        });
+        return figure;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        games: {
+            // metrics, stacked area plot and bar chart of a selection, in one pass over the rows
+            update_dashboard: function (selectedPlatforms, selectedGenres, selectedStartYear, selectedEndYear,
+                                       dataVersion, data) {
+                // data versions too large for the browser are sent without the dataset and answered by the server
+                if (!data) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                var columns = getColumns(data);
+                var platformFlags = selectedFlags(data.platforms, selectedPlatforms);
+                var genreFlags = selectedFlags(data.genres, selectedGenres);
+                var startYear = Number(selectedStartYear || 2000);
+                var endYear = Number(selectedEndYear || 2022);
+                var yearsNumber = Math.max(endYear - startYear + 1, 0);
+
+                var scales = data.scales;
+                function isSelected(row) {
+                    var year = columns.year[row];
+                    return year >= startYear && year <= endYear
+                        && platformFlags[columns.platform[row]] && genreFlags[columns.genre[row]];
+                }
+                // the scores of the selected rows in their order, as the server reads them back for a mean
+                // halfway between two rounded values; the missing scores are zeros in pandas' sum
+                function getSelectedValues(column, scale) {
+                    var values = [];
+                    for (var row = 0; row < data.rows; row++) {
+                        if (isSelected(row)) {
+                            var value = rint(columns[column][row] * scale) / scale;
+                            values.push(isNaN(value) ? 0 : value);
+                        }
+                    }
+                    return values;
+                }
+
+                // the scores are summed as integers scaled by the number of decimals, as in the data cube
+                var gamesNumber = 0;
+                var userScoreSum = 0;
+                var userScoreCount = 0;
+                var criticScoreSum = 0;
+                var criticScoreCount = 0;
+                var counts = new Float64Array(data.platforms.length * yearsNumber);
+                var genreCounts = new Float64Array(data.genres.length);
+                var ageRatingSums = new Float64Array(data.genres.length);
+                var ageRatingCounts = new Float64Array(data.genres.length);
+                for (var row = 0; row < data.rows; row++) {
+                    if (!isSelected(row)) {
+                        continue;
+                    }
+                    var year = columns.year[row];
+                    var platform = columns.platform[row];
+                    var genre = columns.genre[row];
+                    gamesNumber += 1;
+                    if (!isNaN(columns.user_score[row])) {
+                        userScoreSum += rint(columns.user_score[row] * scales.user_score);
+                        userScoreCount += 1;
+                    }
+                    if (!isNaN(columns.critic_score[row])) {
+                        criticScoreSum += rint(columns.critic_score[row] * scales.critic_score);
+                        criticScoreCount += 1;
+                    }
+                    counts[platform * yearsNumber + year - startYear] += 1;
+                    genreCounts[genre] += 1;
+                    if (!isNaN(columns.age_rating[row])) {
+                        ageRatingSums[genre] += rint(columns.age_rating[row] * scales.age_rating);
+                        ageRatingCounts[genre] += 1;
+                    }
+                }
+
+                if (gamesNumber === 0) {
+                    return ['0', '0', '0', data.figures.empty_area, data.figures.empty_bar];
+                }
+                return [
+                    String(gamesNumber),
+                    formatScore(roundedMean(userScoreSum, userScoreCount, scales.user_score, function () {
+                        return getSelectedValues('user_score', scales.user_score);
+                    })),
+                    formatScore(roundedMean(criticScoreSum, criticScoreCount, scales.critic_score, function () {
+                        return getSelectedValues('critic_score', scales.critic_score);
+                    })),
+                    stackedAreaPlot(data, startYear, counts),
+                    barChart(data, genreCounts, ageRatingSums, ageRatingCounts)
+                ];
+            }
+        }
+    });
+})();
@@ -0,0 +1,404 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+from games_dataset import clean_games, read_games
+
+
+# types of the cleaned dataset before the compact schema: strings as Python objects and float64 numbers
+legacy_dtypes = {
+    'Name': object,
+    'Platform': object,
+    'Year_of_Release': 'float64',
+    'Genre': object,
+    'Critic_Score': 'float64',
+    'User_Score': 'float64',
+    'Rating': object,
+}
+
+# selection used for the filter timings: two popular platforms, one genre and a narrow year range
+benchmark_selection = (['PS2', 'X360'], ['Action'], 2005, 2010)
+
+
+# define a function that returns the cleaned dataset repeated the given number of times
+def load_scaled_games(csv_path, scale):
+    df = clean_games(pd.read_csv(csv_path))
+    if scale > 1:
+        df = pd.concat([df] * scale, ignore_index=True)
+    return df.reset_index(drop=True)
+
+
+# define a function that returns the median duration of a function call in milliseconds
+def time_call(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return sorted(durations)[len(durations) // 2]
+
+
+# define the filter of the object-typed dataset as it was done before the filter engine
+def legacy_apply_filters(df, selected_platforms, selected_genres, selected_start_year, selected_end_year):
+    filtered_df_by_platform = df[df['Platform'].isin(selected_platforms)]
+    filtered_df_by_platform_genre = filtered_df_by_platform[filtered_df_by_platform['Genre'].isin(selected_genres)]
+    filtered_df_by_platform_genre_year = (
+        filtered_df_by_platform_genre.query(f"Year_of_Release>={selected_start_year} and Year_of_Release<={selected_end_year}"))
+    return filtered_df_by_platform_genre_year.copy()
+
+
+# define a function that writes a synthetic games dataset with the schema of games.csv: the rows of
+# the original file are repeated with numbered names and slightly changed scores, chunk by chunk
+def generate_synthetic_games(csv_path, scale, output_path, seed=0):
+    raw_df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    random_generator = np.random.default_rng(seed)
+    critic_scores = pd.to_numeric(raw_df['Critic_Score'], errors='coerce')
+    user_scores = pd.to_numeric(raw_df['User_Score'], errors='coerce')
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', newline='') as file:
+        raw_df.head(0).to_csv(file, index=False)
+        for copy_number in range(scale):
+            copy_df = raw_df.copy()
+            if copy_number:
+                copy_df['Name'] = copy_df['Name'] + f' #{copy_number}'
+                # keep missing and 'tbd' values as they are, so that cleaning drops the same share of rows
+                new_critic_scores = (critic_scores + random_generator.integers(-3, 4, len(raw_df))).clip(0, 100)
+                new_user_scores = (user_scores + random_generator.integers(-3, 4, len(raw_df)) / 10).clip(0, 10)
+                copy_df['Critic_Score'] = copy_df['Critic_Score'].mask(critic_scores.notna(),
+                                                                       new_critic_scores.map('{:.0f}'.format))
+                copy_df['User_Score'] = copy_df['User_Score'].mask(user_scores.notna(),
+                                                                   new_user_scores.map('{:.1f}'.format))
+            copy_df.to_csv(file, header=False, index=False)
+    return output_path
+
+
+# define a function that returns the id of the current commit, so that results of different commits can be compared
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# define a function that returns the selections used by the callback and load benchmarks
+def get_benchmark_selections(genres_list):
+    return {
+        'empty': (None, None, None, None),
+        'single_platform': (['PS2'], None, None, None),
+        'all_genres': (None, genres_list, None, None),
+        'narrow_years': (None, None, 2008, 2009),
+        'no_data': (['PS2'], None, 2019, 2021),
+    }
+
+
+# define a function that times apply_filters(), the data cube and every panel function of the dashboard
+# for every benchmark selection; caches are bypassed, so every call does the full work: build_dashboard()
+# calls the cached apply_filters(), so the filter cache is cleared before each of its calls
+def benchmark_callbacks(repeat):
+    import games_market_dash_Evgeniia_Galiaukh as dashboard
+
+    apply_filters = dashboard.apply_filters.__wrapped__
+    build_dashboard = dashboard.build_dashboard.__wrapped__
+    data = dashboard.games_data.current
+    results = {'rows': data.df.shape[0], 'selections': {}}
+    for selection_name, selection in get_benchmark_selections(data.genres_list).items():
+        selected_cube = dashboard.select_cube(*selection)
+        filtered_df = apply_filters(*selection)
+        results['selections'][selection_name] = {
+            'apply_filters': time_call(lambda: apply_filters(*selection), repeat),
+            'data_cube_select': time_call(lambda: dashboard.select_cube(*selection), repeat),
+            'apply_filters_to_games_number': time_call(
+                lambda: dashboard.apply_filters_to_games_number(selected_cube), repeat),
+            'apply_filters_to_average_user_score': time_call(
+                lambda: dashboard.apply_filters_to_average_user_score(selected_cube), repeat),
+            'apply_filters_to_average_critic_score': time_call(
+                lambda: dashboard.apply_filters_to_average_critic_score(selected_cube), repeat),
+            'display_stacked_area_plot': time_call(lambda: dashboard.display_stacked_area_plot(selected_cube), repeat),
+            'display_scatter_plot': time_call(lambda: dashboard.display_scatter_plot(filtered_df), repeat),
+            'display_bar_chart': time_call(lambda: dashboard.display_bar_chart(selected_cube), repeat),
+            'build_dashboard': time_call(lambda: (dashboard.filter_cache.clear(), build_dashboard(*selection)),
+                                         repeat),
+        }
+    return results
+
+
+# define a function that runs the dashboard on a local threaded server, used by the load benchmark
+def serve(port):
+    from werkzeug.serving import make_server
+    from wsgi import create_app
+
+    make_server('127.0.0.1', port, create_app(), threaded=True).serve_forever()
+
+
+# define a function that returns the request body of the dashboard callback for a selection
+def get_callback_request(dependency, selection):
+    values = dict(zip(['platforms', 'genres', 'start-year', 'end-year'], selection))
+    outputs = []
+    for output in dependency['output'].strip('.').split('...'):
+        component_id, component_property = output.rsplit('.', 1)
+        outputs.append({'id': component_id, 'property': component_property.split('@')[0]})
+    return {
+        'output': dependency['output'],
+        'outputs': outputs if dependency['output'].startswith('..') else outputs[0],
+        'inputs': [{'id': dependency_input['id'], 'property': dependency_input['property'],
+                    'value': values.get(dependency_input['id'])} for dependency_input in dependency['inputs']],
+        'state': [{'id': dependency_state['id'], 'property': dependency_state['property'],
+                   'value': values.get(dependency_state['id'])} for dependency_state in dependency['state']],
+        'changedPropIds': ['platforms.value'],
+    }
+
+
+# define a function that returns a free local port, chosen by the system when binding to port 0
+def get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        server_socket.bind(('127.0.0.1', 0))
+        return server_socket.getsockname()[1]
+
+
+# define a function that returns the command starting a local dashboard server of the given kind:
+# the threaded development server, gunicorn with the production settings or waitress
+def get_server_command(server, port):
+    games_directory = os.path.dirname(os.path.abspath(__file__))
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', os.path.join(games_directory, 'gunicorn.conf.py'),
+                '--bind', f'127.0.0.1:{port}']
+    if server == 'waitress':
+        return [sys.executable, os.path.join(games_directory, 'wsgi.py'), '--host', '127.0.0.1', '--port', str(port)]
+    return [sys.executable, __file__, 'serve', '--port', str(port)]
+
+
+# define a function that sends dashboard updates from concurrent clients and measures the latency percentiles
+# and the throughput; without a URL a local server of the given kind is started with the given dataset
+# and caches disabled
+def benchmark_load(url, csv_path, clients, requests_number, seed=0, server='werkzeug'):
+    server_process = None
+    if url is None:
+        port = get_free_port()
+        url = f'http://127.0.0.1:{port}'
+        # the cache warm-up would run inside the measured window, so it is disabled with the caches
+        environment = dict(os.environ, GAMES_CSV=os.path.abspath(csv_path),
+                           GAMES_FILTER_CACHE_SIZE='0', GAMES_DASHBOARD_CACHE_SIZE='0', GAMES_WARM_CACHE='0')
+        environment.pop('GAMES_CACHE_DIR', None)
+        server_process = subprocess.Popen(get_server_command(server, port),
+                                          env=environment, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(600):
+            try:
+                dependencies = json.load(urllib.request.urlopen(f'{url}/_dash-dependencies'))
+                break
+            except OSError:
+                time.sleep(0.5)
+        else:
+            raise RuntimeError(f'dashboard at {url} did not start')
+        layout = json.load(urllib.request.urlopen(f'{url}/_dash-layout'))
+        genres_list = [option['value'] for option in find_component(layout, 'genres')['props']['options']]
+        dependency = next(dependency for dependency in dependencies if 'games_number' in dependency['output'])
+        request_bodies = [json.dumps(get_callback_request(dependency, selection)).encode()
+                          for selection in get_benchmark_selections(genres_list).values()]
+
+        def send(request_body):
+            request = urllib.request.Request(f'{url}/_dash-update-component', data=request_body,
+                                             headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response_bytes = len(response.read())
+            except OSError:
+                # failed requests are counted as errors, their latency is not included in the percentiles
+                return None, 0
+            return (time.perf_counter() - start) * 1000, response_bytes
+
+        random.seed(seed)
+        schedule = [random.choice(request_bodies) for _ in range(requests_number)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            responses = list(executor.map(send, schedule))
+        duration = time.perf_counter() - start
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+
+    latencies = np.array([latency for latency, _ in responses if latency is not None])
+    if latencies.size == 0:
+        latencies = np.array([np.nan])
+    return {
+        'url': url,
+        'server': server if server_process is not None else None,
+        'clients': clients,
+        'requests': requests_number,
+        'errors': sum(latency is None for latency, _ in responses),
+        'latency_ms': {'p50': float(np.percentile(latencies, 50)),
+                       'p95': float(np.percentile(latencies, 95)),
+                       'p99': float(np.percentile(latencies, 99))},
+        'throughput_rps': requests_number / duration,
+        'mean_response_bytes': float(np.mean([response_bytes for _, response_bytes in responses])),
+    }
+
+
+# define a function that finds a component by id in the JSON of a dashboard layout
+def find_component(component, component_id):
+    if isinstance(component, list):
+        return next((found for child in component if (found := find_component(child, component_id))), None)
+    if not isinstance(component, dict):
+        return None
+    if component.get('props', {}).get('id') == component_id:
+        return component
+    return find_component(component.get('props', {}).get('children'), component_id)
+
+
+# define a function that compares memory, filter and groupby costs of the object-typed and the compact dataset
+def benchmark_dtypes(csv_path, scale, repeat):
+    compact_df = load_scaled_games(csv_path, scale)
+    legacy_df = compact_df.astype(legacy_dtypes)
+    compact_names = compact_df.pop('Name')
+    filter_engine = FilterEngine(compact_df)
+
+    legacy_memory = legacy_df.memory_usage(deep=True).sum()
+    compact_memory = compact_df.memory_usage(deep=True).sum()
+    names_memory = compact_names.memory_usage(deep=True)
+
+    results = {
+        'rows': compact_df.shape[0],
+        'memory_mb': {
+            'legacy': legacy_memory / 2 ** 20,
+            'compact_without_names': compact_memory / 2 ** 20,
+            'names': names_memory / 2 ** 20,
+        },
+        'filter_ms': {
+            'legacy': time_call(lambda: legacy_apply_filters(legacy_df, *benchmark_selection), repeat),
+            'compact': time_call(lambda: legacy_apply_filters(compact_df, *benchmark_selection), repeat),
+            'compact_filter_engine': time_call(lambda: compact_df.take(filter_engine.select(*benchmark_selection)),
+                                               repeat),
+        },
+        'groupby_ms': {
+            'legacy': time_call(lambda: legacy_df.groupby(['Year_of_Release', 'Platform']).size(), repeat),
+            'compact': time_call(lambda: compact_df.groupby(['Year_of_Release', 'Platform'], observed=True).size(),
+                                 repeat),
+        },
+        'copy_ms': {
+            'legacy': time_call(legacy_df.copy, repeat),
+            'compact': time_call(compact_df.copy, repeat),
+        },
+    }
+    return results
+
+
+# define a function that returns the duration in seconds and the peak of the memory allocated by a function call in MB
+def measure_peak_memory(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        function()
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return duration, peak / 2 ** 20
+
+
+# define a function that compares reading and cleaning a CSV file at once and chunk by chunk
+def benchmark_ingest(csv_path, chunk_rows):
+    whole_duration, whole_peak = measure_peak_memory(lambda: clean_games(pd.read_csv(csv_path)))
+    results = {'csv': csv_path, 'file_mb': os.path.getsize(csv_path) / 2 ** 20,
+               'whole': {'seconds': whole_duration, 'peak_mb': whole_peak}}
+    for rows in chunk_rows:
+        duration, peak = measure_peak_memory(lambda: read_games(csv_path, rows))
+        results[f'chunks_{rows}'] = {'seconds': duration, 'peak_mb': peak}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the games dashboard')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    dtypes_parser = subparsers.add_parser('dtypes', help='compare the object-typed and the compact dataset')
+    dtypes_parser.add_argument('--csv', default='games.csv')
+    dtypes_parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100],
+                               help='number of times the cleaned dataset is repeated')
+    dtypes_parser.add_argument('--repeat', type=int, default=20)
+
+    synth_parser = subparsers.add_parser('synth', help='generate synthetic datasets with the schema of games.csv')
+    synth_parser.add_argument('--csv', default='games.csv')
+    synth_parser.add_argument('--scale', type=int, nargs='+', default=[10, 100, 1000])
+    synth_parser.add_argument('--directory', default='bench_data')
+
+    callbacks_parser = subparsers.add_parser('callbacks', help='time apply_filters() and the panel functions')
+    callbacks_parser.add_argument('--csv', nargs='+', default=['games.csv'])
+    callbacks_parser.add_argument('--repeat', type=int, default=20)
+
+    load_parser = subparsers.add_parser('load', help='load test the /_dash-update-component endpoint')
+    load_parser.add_argument('--url', help='URL of a running dashboard, by default a local server is started')
+    load_parser.add_argument('--csv', default='games.csv')
+    load_parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    load_parser.add_argument('--requests', type=int, default=200)
+    load_parser.add_argument('--server', choices=['werkzeug', 'gunicorn', 'waitress'], default='werkzeug',
+                             help='kind of the local server started without --url')
+
+    ingest_parser = subparsers.add_parser('ingest', help='compare reading the CSV at once and chunk by chunk')
+    ingest_parser.add_argument('--csv', nargs='+', default=['games.csv'])
+    ingest_parser.add_argument('--chunk-rows', type=int, nargs='+', default=[10_000, 100_000])
+
+    serve_parser = subparsers.add_parser('serve', help=argparse.SUPPRESS)
+    serve_parser.add_argument('--port', type=int, default=8050)
+
+    for subparser in (dtypes_parser, synth_parser, callbacks_parser, load_parser, ingest_parser):
+        subparser.add_argument('--output', help='path of the JSON file with the results, '
+                                                'by default bench_results/<commit>-<benchmark>.json')
+
+    args = parser.parse_args()
+    if args.benchmark == 'serve':
+        serve(args.port)
+        return
+
+    if args.benchmark == 'dtypes':
+        results = [benchmark_dtypes(args.csv, scale, args.repeat) for scale in args.scale]
+    elif args.benchmark == 'synth':
+        results = [{'scale': scale,
+                    'path': generate_synthetic_games(args.csv, scale,
+                                                     os.path.join(args.directory, f'games_x{scale}.csv'))}
+                   for scale in args.scale]
+    elif args.benchmark == 'ingest':
+        results = [benchmark_ingest(csv_path, args.chunk_rows) for csv_path in args.csv]
+    elif args.benchmark == 'callbacks':
+        # the dashboard loads its dataset on import, so every dataset is measured in its own process
+        if len(args.csv) > 1:
+            results = []
+            for csv_path in args.csv:
+                output = subprocess.run([sys.executable, __file__, 'callbacks', '--csv', csv_path,
+                                         '--repeat', str(args.repeat), '--output', os.devnull],
+                                        capture_output=True, text=True, check=True).stdout
+                results.extend(json.loads(output)['results'])
+        else:
+            os.environ['GAMES_CSV'] = args.csv[0]
+            results = [dict(benchmark_callbacks(args.repeat), csv=args.csv[0])]
+    else:
+        results = [benchmark_load(args.url, args.csv, clients, args.requests, server=args.server)
+                   for clients in args.clients]
+
+    report = {'benchmark': args.benchmark, 'commit': get_commit(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'results': results}
+    print(json.dumps(report, indent=2))
+
+    output = args.output or os.path.join('bench_results', f'{report["commit"]}-{args.benchmark}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
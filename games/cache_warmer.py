@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, where the memory budget is not checked
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# define a function that returns the peak memory of the process in bytes, or None if it is not known
+def get_peak_memory():
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak_memory if sys.platform == 'darwin' else peak_memory * 1024
+
+
+# define a function that returns the most common selections of the dashboard: the default state,
+# every single platform, every single genre and every single year
+def get_common_selections(platforms, genres, years):
+    return ([(None, None, None, None)]
+            + [([platform], None, None, None) for platform in platforms]
+            + [(None, [genre], None, None) for genre in genres]
+            + [(None, None, year, year) for year in years])
+
+
+# background warm-up of the caches of the dashboard: the cached functions are called for the most
+# common selections on a small thread pool, so that the first users of a selection after a start
+# or a data reload find the results in the cache. A run stops when its time or memory budget is spent
+# or when the data version changes, which starts a new run; the report of the last run is kept
+class CacheWarmer:
+    def __init__(self, functions, get_selections, get_version, max_workers=2, time_budget=60.0, memory_budget=None):
+        self.functions = functions
+        self.get_selections = get_selections
+        self.get_version = get_version
+        self.max_workers = max_workers
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self.report = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    # start a run once per process; threads don't survive a fork, so a forked worker starts its own
+    def start(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._start_run()
+            self._thread_pid = os.getpid()
+
+    # start a new run for a new data version, in processes where the warm-up was started
+    def restart(self):
+        if self._thread_pid == os.getpid():
+            self._start_run()
+
+    def _start_run(self):
+        threading.Thread(target=self.run, name='games-cache-warmer', daemon=True).start()
+
+    # warm the caches for every common selection within the budget and return the report of the run
+    def run(self):
+        version = self.get_version()
+        selections = self.get_selections()
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+        start_memory = get_peak_memory()
+        warmed = []
+        stopped_by = []
+
+        def warm(selection):
+            if stopped_by:
+                return
+            if time.perf_counter() > deadline:
+                stopped_by.append('time budget')
+                return
+            if (self.memory_budget is not None and start_memory is not None
+                    and get_peak_memory() - start_memory > self.memory_budget):
+                stopped_by.append('memory budget')
+                return
+            if self.get_version() != version:
+                stopped_by.append('data version change')
+                return
+            try:
+                for function in self.functions:
+                    function(*selection)
+            except Exception:
+                logger.exception('warming the caches for %s failed', selection)
+                return
+            warmed.append(selection)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='games-cache-warmer') as executor:
+            list(executor.map(warm, selections))
+
+        self.report = {'version': version,
+                       'states': len(selections),
+                       'warmed': len(warmed),
+                       'seconds': round(time.perf_counter() - started, 3),
+                       'stopped_by': stopped_by[0] if stopped_by else None}
+        logger.info('warmed %d of %d dashboard states of version %s in %.2f s%s',
+                    self.report['warmed'], self.report['states'], version, self.report['seconds'],
+                    f", stopped by the {self.report['stopped_by']}" if stopped_by else '')
+        return self.report
+
+    # return the report of the last run as gauges (name, description, value) for the /metrics endpoint
+    def gauges(self):
+        if self.report is None:
+            return []
+        return [('games_dashboard_cache_warmer_states', 'Number of dashboard states of the last warm-up.',
+                 self.report['states']),
+                ('games_dashboard_cache_warmer_warmed', 'Number of dashboard states warmed by the last warm-up.',
+                 self.report['warmed'])]
@@ -0,0 +1,39 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+
+# define a function that returns a numpy array as base64 of its little-endian bytes,
+# which the browser reads back as a typed array without parsing numbers
+def encode_array(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+
+# define a function that returns the codes of a column and its sorted distinct values,
+# with the smallest unsigned type that holds the codes
+def encode_categories(column):
+    codes, values = pd.factorize(column, sort=True)
+    dtype = '<u1' if len(values) <= np.iinfo(np.uint8).max else '<u2'
+    return encode_array(codes, dtype), dtype, np.asarray(values).tolist()
+
+
+# define a function that returns the columns of the dashboard as compact column-oriented data
+# for the dcc.Store of the clientside mode: the repeated strings are sent once and referenced by codes,
+# numbers are sent as binary float32/int16 arrays; the age rating is the column derived when the rows are loaded
+def encode_games(df):
+    platform_codes, platform_codes_dtype, platforms = encode_categories(df['Platform'])
+    genre_codes, genre_codes_dtype, genres = encode_categories(df['Genre'])
+    return {
+        'rows': int(df.shape[0]),
+        'platforms': platforms,
+        'genres': genres,
+        'columns': {
+            'platform': {'dtype': platform_codes_dtype, 'data': platform_codes},
+            'genre': {'dtype': genre_codes_dtype, 'data': genre_codes},
+            'year': {'dtype': '<i2', 'data': encode_array(df['Year_of_Release'], '<i2')},
+            'user_score': {'dtype': '<f4', 'data': encode_array(df['User_Score'], '<f4')},
+            'critic_score': {'dtype': '<f4', 'data': encode_array(df['Critic_Score'], '<f4')},
+            'age_rating': {'dtype': '<f4', 'data': encode_array(df['Age_Rating'], '<f4')},
+        },
+    }
@@ -0,0 +1,20 @@
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+
+# define a function that compresses the responses of the server with the first of the algorithms
+# the browser accepts, brotli before gzip by default; responses smaller than min_size bytes are sent
+# as they are, compressing them costs more time than it saves. Returns False if flask-compress
+# (dash[compress]) is not installed, in which case the responses are sent uncompressed
+def init_compression(server, algorithms=('br', 'gzip'), min_size=1000, brotli_level=4, gzip_level=6):
+    if Compress is None:
+        return False
+    # the algorithms are read when Compress is initialized, so they are set before
+    server.config.update(COMPRESS_ALGORITHM=list(algorithms),
+                         COMPRESS_MIN_SIZE=min_size,
+                         COMPRESS_BR_LEVEL=brotli_level,
+                         COMPRESS_LEVEL=gzip_level)
+    Compress(server)
+    return True
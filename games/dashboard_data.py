@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_request_context
+import pandas as pd
+
+from data_cube import DataCube
+from filter_engine import FilterEngine
+from games_dataset import (concat_games, feather, get_cache_path, get_file_hash, load_games, read_appended_games,
+                           write_cache)
+
+
+logger = logging.getLogger(__name__)
+
+
+# define a function that maps values to colors in the order of the values, repeating the color sequence
+def get_color_map(values, color_sequence):
+    return {value: color_sequence[i % len(color_sequence)] for i, value in enumerate(values)}
+
+
+# define a function that adds the columns derived from games.csv, computed once when rows are loaded:
+# the age rating is the minimum age of the ESRB rating of a game
+def add_derived_columns(df, rating_to_age):
+    df['Age_Rating'] = df['Rating'].astype(object).map(rating_to_age).astype('float32')
+    return df
+
+
+# columns added by add_derived_columns(), which are not written to the columnar copy of games.csv
+derived_columns = ['Age_Rating']
+
+
+# one version of the dashboard data: the cleaned dataset, the game names, the filter index, the cube
+# and the values derived from them. A version is never modified, a new version replaces it as a whole;
+# the version id is the hash of the part of games.csv it was read from, so all workers agree on it
+class DashboardData:
+    def __init__(self, df, names, version, csv_size, rating_to_age, color_sequences,
+                 filter_engine=None, data_cube=None):
+        self.df = df
+        self.names = names
+        self.version = version
+        self.csv_size = csv_size
+        self.rating_to_age = rating_to_age
+        self.color_sequences = color_sequences
+        self.filter_engine = FilterEngine(df) if filter_engine is None else filter_engine
+        self.data_cube = DataCube(df) if data_cube is None else data_cube
+
+        # the metrics of the whole dataset are totals of the cube, not a pass over the rows
+        all_games_cube = self.data_cube.filter({})
+        self.all_games_number = df.shape[0]
+        self.all_average_user_score = all_games_cube.rounded_total('average_user_score', 2, lambda: df['User_Score'])
+        self.all_average_critic_score = all_games_cube.total('average_critic_score')
+        self.platforms_list = df["Platform"].unique().tolist()
+        self.genres_list = df["Genre"].unique().tolist()
+        self.platforms_color_map = get_color_map(self.platforms_list, color_sequences['Platform'])
+        self.genres_color_map = get_color_map(self.genres_list, color_sequences['Genre'])
+
+    # load the whole games.csv, from the columnar copy if it is up to date
+    @classmethod
+    def from_csv(cls, csv_path, rating_to_age, color_sequences):
+        csv_size = os.path.getsize(csv_path)
+        file_hash = get_file_hash(csv_path, csv_size)
+        df = load_games(csv_path, file_hash=file_hash)
+        # game names are only needed for the hover text of the scatter plot,
+        # so they are kept apart from the frame that is filtered on every request
+        names = df.pop('Name')
+        add_derived_columns(df, rating_to_age)
+        return cls(df, names, file_hash[:16], csv_size, rating_to_age, color_sequences)
+
+    # return the next version with the rows appended to games.csv; the filter index and the cube are updated
+    # with the new rows only, the cube is built again if the new rows bring a new platform, genre or year;
+    # the same version is returned while no complete line was appended
+    def append(self, csv_path):
+        new_df, csv_size = read_appended_games(csv_path, self.csv_size)
+        if csv_size == self.csv_size:
+            return self
+        new_names = new_df.pop('Name')
+        add_derived_columns(new_df, self.rating_to_age)
+        df = concat_games([self.df, new_df])
+        names = pd.concat([self.names, new_names], ignore_index=True)
+        return DashboardData(df, names, get_file_hash(csv_path, csv_size)[:16], csv_size,
+                             self.rating_to_age, self.color_sequences,
+                             filter_engine=self.filter_engine.append(new_df),
+                             data_cube=self.data_cube.append(new_df))
+
+    # return the version of games.csv as it is now: the same version if the file didn't change,
+    # the appended version if rows were only added at the end of the file, otherwise a fully loaded version
+    def reload(self, csv_path):
+        csv_size = os.path.getsize(csv_path)
+        if csv_size == self.csv_size and get_file_hash(csv_path, csv_size)[:16] == self.version:
+            return self
+        appended = (csv_size > self.csv_size
+                    and self._ends_line(csv_path)
+                    and get_file_hash(csv_path, self.csv_size)[:16] == self.version)
+        if appended:
+            data = self.append(csv_path)
+            if data.csv_size == csv_size and data is not self:
+                self._write_cache(csv_path, data)
+            return data
+        return DashboardData.from_csv(csv_path, self.rating_to_age, self.color_sequences)
+
+    # check that the part of the file this version was read from ends with a complete line
+    def _ends_line(self, csv_path):
+        if self.csv_size == 0:
+            return False
+        with open(csv_path, 'rb') as file:
+            file.seek(self.csv_size - 1)
+            return file.read(1) == b'\n'
+
+    # write the columnar copy of an appended version, so that the next start doesn't parse games.csv
+    @staticmethod
+    def _write_cache(csv_path, data):
+        if feather is None:
+            return
+        try:
+            write_cache(data.df.drop(columns=derived_columns).assign(Name=data.names),
+                        get_cache_path(csv_path, file_hash=get_file_hash(csv_path, data.csv_size)))
+        except OSError:
+            # a read-only deployment parses the CSV on the next start
+            pass
+
+
+# holder of the current DashboardData that replaces it atomically; during a request the version
+# that was current when the request first used it is returned, so a request never mixes two versions
+class DashboardDataStore:
+    def __init__(self, data):
+        self._data = data
+        self._swap_listeners = []
+
+    @property
+    def current(self):
+        if has_request_context():
+            return g.setdefault('dashboard_data', self._data)
+        return self._data
+
+    @property
+    def latest(self):
+        return self._data
+
+    # call the listener with the new version after every swap, e.g. to clear caches of the old version
+    def on_swap(self, listener):
+        self._swap_listeners.append(listener)
+
+    def swap(self, data):
+        self._data = data
+        for listener in self._swap_listeners:
+            listener(data)
+
+
+# background thread that checks the modification time and the size of games.csv and swaps in the new
+# version of the dashboard data when they change; the new version is built off the request path
+class CsvWatcher:
+    def __init__(self, csv_path, store, interval):
+        self.csv_path = csv_path
+        self.store = store
+        self.interval = interval
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    def _file_state(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # start the thread once per process; threads don't survive a fork, so a forked worker starts its own
+    def start(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='games-csv-watcher', daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        # the file may have changed since the data was loaded, so the first check always compares the content
+        file_state = None
+        while True:
+            time.sleep(self.interval)
+            new_file_state = self._file_state()
+            if new_file_state is None or new_file_state == file_state:
+                continue
+            file_state = new_file_state
+            self.reload()
+
+    # build the new version and swap it in; a failed reload keeps the current version
+    def reload(self):
+        current = self.store.latest
+        try:
+            data = current.reload(self.csv_path)
+        except Exception:
+            logger.exception('reloading %s failed, version %s is kept', self.csv_path, current.version)
+            return current
+        if data is not current:
+            logger.info('games data version %s replaced by %s', current.version, data.version)
+            self.store.swap(data)
+        return data
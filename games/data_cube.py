@@ -0,0 +1,263 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+# dimension of the cube: a column whose distinct values are the positions of one axis of the cube;
+# a 'values' dimension is filtered by a list of values, a 'range' dimension by an inclusive (start, end) range
+class Dimension:
+    def __init__(self, name, column, kind='values'):
+        if kind not in ('values', 'range'):
+            raise ValueError(f"unknown kind of dimension {name!r}: {kind!r}")
+        self.name = name
+        self.column = column
+        self.kind = kind
+
+
+# measure of the cube: the number of games ('count') or the mean of a column ('mean'),
+# which is kept as the sum and the number of non-null values of the column in every cell.
+# The values of a column with a known number of decimals are summed as exact integers scaled by 10 ** decimals,
+# so that a compact storage type, like float32 for scores with one decimal, doesn't change the means
+class Measure:
+    def __init__(self, name, aggregate, column=None, decimals=None):
+        if aggregate not in ('count', 'mean'):
+            raise ValueError(f"unknown aggregate of measure {name!r}: {aggregate!r}")
+        if aggregate == 'mean' and column is None:
+            raise ValueError(f"measure {name!r} needs a column to average")
+        self.name = name
+        self.aggregate = aggregate
+        self.column = column
+        self.decimals = decimals
+
+
+# dimensions and measures of the cubes, registered once at startup before the first cube is built
+dimensions = {}
+measures = {}
+
+
+# define a function that registers a dimension of the cubes; there can be one range dimension,
+# which is always the last axis, the cube keeps running totals along it
+def register_dimension(name, column, kind='values'):
+    if kind == 'range' and any(dimension.kind == 'range' for dimension in dimensions.values()):
+        raise ValueError('only one range dimension can be registered')
+    dimensions[name] = Dimension(name, column, kind)
+    for range_name in [other.name for other in dimensions.values() if other.kind == 'range']:
+        dimensions[range_name] = dimensions.pop(range_name)
+
+
+# define a function that registers a measure of the cubes
+def register_measure(name, aggregate, column=None, decimals=None):
+    measures[name] = Measure(name, aggregate, column, decimals)
+
+
+# pre-aggregated counts and sums of the games dataset for every combination of the registered dimensions,
+# so that metrics and aggregate graphs never touch row-level data; derived columns averaged by a measure,
+# like the age rating, are computed once when the dataset is loaded
+class DataCube:
+    def __init__(self, df):
+        self.dimensions = list(dimensions.values())
+        self.measures = dict(measures)
+        self.columns = sorted({measure.column for measure in self.measures.values() if measure.column is not None})
+        # factor of the exact integer sums of the columns with a known number of decimals, None for the others
+        self.scales = dict.fromkeys(self.columns)
+        for measure in self.measures.values():
+            if measure.column is not None and measure.decimals is not None:
+                self.scales[measure.column] = max(self.scales[measure.column] or 1, 10 ** measure.decimals)
+        if not self.dimensions or self.dimensions[-1].kind != 'range':
+            raise ValueError('the cube needs a range dimension')
+
+        codes = []
+        self.axes = {}
+        for dimension in self.dimensions:
+            dimension_codes, self.axes[dimension.name] = self._factorize(df[dimension.column])
+            codes.append(dimension_codes)
+        shape = tuple(len(axis_values) for axis_values in self.axes.values())
+
+        cells = np.ravel_multi_index(codes, shape)
+        self.count, self.sum, self.not_null_count = self._aggregate(cells, self._column_values(df), shape)
+        self._accumulate_range()
+
+    # return the averaged columns of the rows as float64 arrays, sums are accumulated in float64
+    # whatever the storage type of the columns is; the columns with a known number of decimals are
+    # scaled and rounded to integers, whose float64 sums are exact
+    def _column_values(self, df):
+        column_values = {}
+        for column in self.columns:
+            values = df[column].to_numpy(dtype=np.float64)
+            if self.scales[column] is not None:
+                values = np.rint(values * self.scales[column])
+            column_values[column] = values
+        return column_values
+
+    # return the count, the sums and the non-null counts of the rows in every cell, computed with bincount
+    # over the cell numbers of the rows, which is one vectorized pass per column
+    def _aggregate(self, cells, column_values, shape):
+        size = int(np.prod(shape))
+        count = np.bincount(cells, minlength=size).astype(np.int64).reshape(shape)
+        sums = {}
+        not_null_counts = {}
+        for column in self.columns:
+            values = column_values[column]
+            not_null = ~np.isnan(values)
+            sums[column] = np.bincount(cells[not_null], weights=values[not_null], minlength=size).reshape(shape)
+            not_null_counts[column] = (np.bincount(cells[not_null], minlength=size)
+                                       .astype(np.int64).reshape(shape))
+        return count, sums, not_null_counts
+
+    # running totals along the range dimension for every combination of the other dimensions,
+    # with a leading zero, so that the total of any range is the difference of two entries
+    def _accumulate_range(self):
+        def accumulate(cube):
+            return np.concatenate([np.zeros(cube.shape[:-1] + (1,), dtype=cube.dtype), cube.cumsum(axis=-1)],
+                                  axis=-1)
+
+        self.running_count = accumulate(self.count)
+        self.running_sum = {column: accumulate(self.sum[column]) for column in self.columns}
+        self.running_not_null_count = {column: accumulate(self.not_null_count[column]) for column in self.columns}
+
+    # return a new cube with the rows of new_df added to their cells, or None if new_df has a value
+    # that is not on an axis of the cube, in which case the cube has to be built again
+    def append(self, new_df):
+        codes = []
+        for dimension in self.dimensions:
+            axis_values = self.axes[dimension.name]
+            if len(axis_values) == 0:
+                return None
+            column = new_df[dimension.column].to_numpy(dtype=axis_values.dtype)
+            column_codes = np.searchsorted(axis_values, column).clip(0, len(axis_values) - 1)
+            if not np.array_equal(axis_values[column_codes], column):
+                return None
+            codes.append(column_codes)
+
+        shape = self.count.shape
+        new_count, new_sum, new_not_null_count = self._aggregate(np.ravel_multi_index(codes, shape),
+                                                                 self._column_values(new_df),
+                                                                 shape)
+        cube = DataCube.__new__(DataCube)
+        cube.dimensions, cube.measures, cube.columns, cube.axes = self.dimensions, self.measures, self.columns, self.axes
+        cube.scales = self.scales
+        cube.count = self.count + new_count
+        cube.sum = {column: self.sum[column] + new_sum[column] for column in self.columns}
+        cube.not_null_count = {column: self.not_null_count[column] + new_not_null_count[column]
+                               for column in self.columns}
+        cube._accumulate_range()
+        return cube
+
+    # return the codes of a column and the sorted distinct values as a plain numpy array
+    @staticmethod
+    def _factorize(column):
+        codes, values = pd.factorize(column, sort=True)
+        return codes, np.asarray(values)
+
+    @staticmethod
+    def _axis_positions(axis_values, selected_values):
+        if not selected_values:
+            return np.arange(len(axis_values))
+        if isinstance(selected_values, str):
+            selected_values = [selected_values]
+        return np.flatnonzero(np.isin(axis_values, list(selected_values)))
+
+    # return the part of the cube matching the filters, a dict of values by dimension name for 'values'
+    # dimensions and of a (start, end) pair for the range dimension; a missing filter, an empty list
+    # or a missing end of the range mean "no filter" for that dimension
+    def filter(self, filters):
+        positions = [self._axis_positions(self.axes[dimension.name], filters.get(dimension.name))
+                     for dimension in self.dimensions[:-1]]
+        range_values = self.axes[self.dimensions[-1].name]
+        start, end = filters.get(self.dimensions[-1].name) or (None, None)
+        # the range axis is sorted, so the selected values are a contiguous range of positions
+        range_start = 0 if start is None else np.searchsorted(range_values, float(start), side='left')
+        range_end = len(range_values) if end is None else np.searchsorted(range_values, float(end), side='right')
+        return CubeSlice(self, positions, range_start, max(range_end, range_start))
+
+
+# selected cells of a DataCube that answers measures grouped by any of the dimensions; totals are read
+# from the running totals along the range dimension, the cells are only copied for grouped queries
+class CubeSlice:
+    def __init__(self, cube, positions, range_start, range_end):
+        self.cube = cube
+        self._positions = positions
+        self._value_cells = np.ix_(*positions)
+        self._range_start = range_start
+        self._range_end = range_end
+        self.axes = {dimension.name: cube.axes[dimension.name][dimension_positions]
+                     for dimension, dimension_positions in zip(cube.dimensions, positions)}
+        self.axes[cube.dimensions[-1].name] = cube.axes[cube.dimensions[-1].name][range_start:range_end]
+
+    @cached_property
+    def _cells(self):
+        return np.ix_(*self._positions, np.arange(self._range_start, self._range_end))
+
+    # number of games in every selected cell, copied on first use
+    @cached_property
+    def count(self):
+        return self.cube.count[self._cells]
+
+    @property
+    def empty(self):
+        return self._total(self.cube.running_count) == 0
+
+    # total of a running total cube over the selected cells, as the sum over the selected values
+    # of the other dimensions of the difference of the running totals at both ends of the range
+    def _total(self, running_cube):
+        return (running_cube[self._value_cells + (self._range_end,)]
+                - running_cube[self._value_cells + (self._range_start,)]).sum()
+
+    # return the value of a measure over all selected cells rounded to the given number of digits, as the mean
+    # of the column of the selected rows was rounded before the cube: for a column summed as scaled integers the
+    # exact mean gives the same result, except when it lies halfway between two rounded values, where the result
+    # depended on the rounding errors of the float64 sum over the rows; that rare case is computed in the same way
+    # from the values of the selected rows, returned in their order by get_values, if it is given
+    def rounded_total(self, measure_name, digits=2, get_values=None):
+        measure = self.cube.measures[measure_name]
+        scale = self.cube.scales.get(measure.column) if measure.aggregate == 'mean' else None
+        if scale is not None and get_values is not None:
+            numerator = int(self._total(self.cube.running_sum[measure.column])) * 10 ** digits
+            denominator = int(self._total(self.cube.running_not_null_count[measure.column])) * scale
+            if denominator and (2 * numerator) % (2 * denominator) == denominator:
+                values = np.rint(np.asarray(get_values(), dtype=np.float64) * scale) / scale
+                return round(pd.Series(values).mean(), digits)
+        return round(self.total(measure_name), digits)
+
+    # return the value of a measure over all selected cells
+    def total(self, measure_name):
+        measure = self.cube.measures[measure_name]
+        if measure.aggregate == 'count':
+            return int(self._total(self.cube.running_count))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self._total(self.cube.running_sum[measure.column])
+                    / (self._total(self.cube.running_not_null_count[measure.column])
+                       * (self.cube.scales[measure.column] or 1)))
+
+    # return the measures for every combination of values of the dimensions with at least one game,
+    # as a frame with a column per dimension and per measure, ordered by the dimensions in the given order
+    def query(self, dimension_names, measure_names):
+        axis_numbers = [self._axis_number(name) for name in dimension_names]
+        other_axis_numbers = tuple(number for number in range(len(self.cube.dimensions))
+                                   if number not in axis_numbers)
+        # the summed cells keep the remaining axes in cube order, which are then put in the given order
+        transposition = np.argsort(np.argsort(axis_numbers))
+
+        def group(cells):
+            return cells.sum(axis=other_axis_numbers).transpose(transposition)
+
+        counts = group(self.count)
+        group_positions = np.nonzero(counts)
+        result = {name: self.axes[name][positions] for name, positions in zip(dimension_names, group_positions)}
+        for measure_name in measure_names:
+            measure = self.cube.measures[measure_name]
+            if measure.aggregate == 'count':
+                result[measure_name] = counts[group_positions]
+                continue
+            sums = group(self.cube.sum[measure.column][self._cells])[group_positions]
+            not_null_counts = group(self.cube.not_null_count[measure.column][self._cells])[group_positions]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[measure_name] = sums / (not_null_counts * (self.cube.scales[measure.column] or 1))
+        return pd.DataFrame(result)
+
+    def _axis_number(self, dimension_name):
+        for number, dimension in enumerate(self.cube.dimensions):
+            if dimension.name == dimension_name:
+                return number
+        raise KeyError(f'unknown dimension {dimension_name!r}')
@@ -0,0 +1,81 @@
+import hashlib
+
+from dash import Patch
+import numpy as np
+
+
+# define a function that feeds a value of a figure property, which may be a numpy array or contain them,
+# to a hash; equal values give the same bytes, numeric arrays are hashed as their raw data
+def update_signature(digest, value):
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        digest.update(f'a{value.dtype.str}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, np.ndarray):
+        update_signature(digest, value.tolist())
+    elif isinstance(value, dict):
+        digest.update(f'd{len(value)}'.encode())
+        for key in sorted(value):
+            update_signature(digest, key)
+            update_signature(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'l{len(value)}'.encode())
+        for item in value:
+            update_signature(digest, item)
+    else:
+        digest.update(f'{type(value).__name__}:{value!r};'.encode())
+
+
+# define a function that returns a short signature of a value of a figure property, the same for equal values
+def get_signature(value):
+    digest = hashlib.blake2b(digest_size=8)
+    update_signature(digest, value)
+    return digest.hexdigest()
+
+
+# define a function that returns the signatures of every property of every trace of a figure, by trace name
+def get_trace_signatures(figure):
+    return {trace.get('name'): {property_name: get_signature(value) for property_name, value in trace.items()}
+            for trace in figure['data']}
+
+
+# define a function that returns the changes from the figure shown in the browser to the new figure as a dash Patch,
+# together with what the 'shown-figures' store keeps of the new figure: the names of the traces in the order
+# the browser has them and the signatures of the layout and of the properties of the traces. The shown figure
+# is only known by these signatures, so the previous figure doesn't have to be built again.
+# The browser may have the traces in another order than the figure it was sent, because added traces
+# are appended, so the store keeps the order of the browser.
+# The whole new figure is returned instead if the layout changed, the traces can't be matched by name
+# or nothing is known of the shown figure
+def patch_figure(shown_figure, new_figure):
+    new_trace_names = [trace.get('name') for trace in new_figure['data']]
+    new_signatures = get_trace_signatures(new_figure)
+    new_shown_figure = {'layout': get_signature(new_figure['layout']), 'properties': new_signatures}
+    if (not shown_figure
+            or len(new_signatures) != len(new_trace_names)
+            or shown_figure['layout'] != new_shown_figure['layout']):
+        return new_figure, dict(new_shown_figure, traces=new_trace_names)
+
+    patch = Patch()
+    shown_trace_names = shown_figure['traces']
+    shown_signatures = shown_figure['properties']
+    new_traces = {trace.get('name'): trace for trace in new_figure['data']}
+    # remove the traces that are gone, from the end, so that the positions of the other traces stay valid
+    for position in reversed(range(len(shown_trace_names))):
+        if shown_trace_names[position] not in new_traces:
+            del patch['data'][position]
+    trace_names = [name for name in shown_trace_names if name in new_traces]
+
+    # update only the changed properties of the kept traces
+    for position, name in enumerate(trace_names):
+        for property_name in shown_signatures[name].keys() - new_signatures[name].keys():
+            del patch['data'][position][property_name]
+        for property_name, signature in new_signatures[name].items():
+            if shown_signatures[name].get(property_name) != signature:
+                patch['data'][position][property_name] = new_traces[name][property_name]
+
+    # add the new traces after the kept ones
+    for name in new_trace_names:
+        if name not in shown_signatures:
+            patch['data'].append(new_traces[name])
+            trace_names.append(name)
+    return patch, dict(new_shown_figure, traces=trace_names)
@@ -0,0 +1,53 @@
+import plotly.io as pio
+
+
+# dark theme of the dashboard graphs, registered once as a plotly template instead of
+# being applied with update_layout to every figure
+pio.templates['games_dark'] = pio.templates['plotly']
+pio.templates['games_dark'].layout.update(
+    paper_bgcolor='#1e1e1e',
+    plot_bgcolor='#1e1e1e',
+    font=dict(color='#CECCE3'),
+    xaxis_title_font=dict(color='#CECCE3'),
+    yaxis_title_font=dict(color='#CECCE3'),
+    title_font=dict(color='#CECCE3'))
+
+# the template as plain JSON data, so that figures can embed it without validating it again
+games_dark_template = pio.templates['games_dark'].to_plotly_json()
+
+
+# define a function that returns a figure as a plain dictionary: the layout skeleton with the theme
+# is filled with the given traces and layout properties, plotly validation is skipped
+def build_figure(traces, title, title_size=None, xaxis_title=None, yaxis_title=None, legend_title=None,
+                 **layout_properties):
+    layout = {
+        'template': games_dark_template,
+        'title': {'text': title},
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0]},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0]},
+        'legend': {'tracegroupgap': 0},
+    }
+    if title_size is not None:
+        layout['title']['font'] = {'size': title_size}
+    if xaxis_title is not None:
+        layout['xaxis']['title'] = {'text': xaxis_title}
+    if yaxis_title is not None:
+        layout['yaxis']['title'] = {'text': yaxis_title}
+    if legend_title is not None:
+        layout['legend']['title'] = {'text': legend_title}
+    for name, value in layout_properties.items():
+        if isinstance(value, dict) and isinstance(layout.get(name), dict):
+            layout[name] = {**layout[name], **value}
+        else:
+            layout[name] = value
+    return {'data': traces, 'layout': layout}
+
+
+# "No data" figures are the same for every empty selection, so they are built once and shared;
+# like all dashboard figures they must not be modified after they are built
+empty_figures = {
+    'area': build_figure([], 'No data'),
+    'scatter': build_figure([], 'No data'),
+    'bar': build_figure([], 'No data', barmode='relative'),
+}
+
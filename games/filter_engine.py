@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+
+# index of the games dataset that is built once at startup and answers filter
+# selections with an array of row positions instead of boolean masks over the whole frame:
+# the rows of the most selective filter are taken from the index and only they are checked
+# against the other filters, so the cost follows the selection size, not the table size
+class FilterEngine:
+    def __init__(self, df):
+        self.rows_number = df.shape[0]
+        # code of the platform and of the genre of every row, and the sorted row positions of every code
+        self.platform_codes, self.platform_values, self.platform_rows = self._index_column(df['Platform'])
+        self.genre_codes, self.genre_values, self.genre_rows = self._index_column(df['Genre'])
+        # row positions ordered by year, so that any year range is a contiguous slice
+        self.years = df['Year_of_Release'].to_numpy()
+        self.year_order = np.argsort(self.years, kind='stable')
+        self.sorted_years = self.years[self.year_order]
+
+    # return the code of every row, the codes of the values and the sorted row positions of every code;
+    # the values of an existing index keep their codes and new values get the next ones
+    @staticmethod
+    def _index_column(column, values=None):
+        column_codes, column_values = pd.factorize(column, sort=True)
+        values = dict(values or {})
+        for value in column_values.tolist():
+            values.setdefault(value, len(values))
+        codes = np.array([values[value] for value in column_values.tolist()], dtype=np.int32)[column_codes]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(values)))[:-1]
+        return codes, values, np.split(order, bounds)
+
+    # return a new engine for the dataset with the rows of new_df appended; the existing positions are kept
+    # and the new positions are merged in, so nothing is sorted again
+    def append(self, new_df):
+        engine = FilterEngine.__new__(FilterEngine)
+        engine.rows_number = self.rows_number + new_df.shape[0]
+        engine.platform_codes, engine.platform_values, engine.platform_rows = self._append_column(
+            self.platform_codes, self.platform_values, self.platform_rows, new_df['Platform'])
+        engine.genre_codes, engine.genre_values, engine.genre_rows = self._append_column(
+            self.genre_codes, self.genre_values, self.genre_rows, new_df['Genre'])
+
+        new_years = new_df['Year_of_Release'].to_numpy()
+        engine.years = np.concatenate([self.years, new_years])
+        new_year_order = np.argsort(new_years, kind='stable')
+        new_sorted_years = new_years[new_year_order]
+        # new rows go after the existing rows of the same year, which keeps the order stable
+        insert_positions = np.searchsorted(self.sorted_years, new_sorted_years, side='right')
+        engine.year_order = np.insert(self.year_order, insert_positions, new_year_order + self.rows_number)
+        engine.sorted_years = np.insert(self.sorted_years, insert_positions, new_sorted_years)
+        return engine
+
+    def _append_column(self, codes, values, rows_by_code, new_column):
+        new_codes, values, new_rows_by_code = self._index_column(new_column, values)
+        appended_rows_by_code = list(rows_by_code) + [np.empty(0, dtype=np.intp)] * (len(values) - len(rows_by_code))
+        for code, new_rows in enumerate(new_rows_by_code):
+            if new_rows.size:
+                appended_rows_by_code[code] = np.concatenate([appended_rows_by_code[code], new_rows + self.rows_number])
+        return np.concatenate([codes, new_codes]), values, appended_rows_by_code
+
+    # return the codes of the selected values, None when the filter is not set
+    @staticmethod
+    def _selected_codes(values, selected_values):
+        if not selected_values:
+            return None
+        if isinstance(selected_values, str):
+            selected_values = [selected_values]
+        return sorted({values[value] for value in selected_values if value in values})
+
+    # return the sorted row positions of the selected codes
+    @staticmethod
+    def _code_rows(rows_by_code, codes):
+        if len(codes) == 1:
+            return rows_by_code[codes[0]]
+        # row positions of different values never overlap, so sorting the concatenation is enough
+        return np.sort(np.concatenate([rows_by_code[code] for code in codes]))
+
+    # return a boolean flag per code, True for the selected codes
+    @staticmethod
+    def _code_flags(values, codes):
+        flags = np.zeros(len(values), dtype=bool)
+        flags[codes] = True
+        return flags
+
+    # return sorted row positions matching the selection, or None when every row matches;
+    # empty selections and missing years mean "no filter" for that column
+    def select(self, selected_platforms, selected_genres, selected_start_year, selected_end_year):
+        platform_codes = self._selected_codes(self.platform_values, selected_platforms)
+        genre_codes = self._selected_codes(self.genre_values, selected_genres)
+        years_selected = bool(selected_start_year or selected_end_year)
+        if years_selected:
+            start_year = float(selected_start_year or 2000)
+            end_year = float(selected_end_year or 2022)
+            year_start = np.searchsorted(self.sorted_years, start_year, side='left')
+            year_end = np.searchsorted(self.sorted_years, end_year, side='right')
+            years_selected = not (year_start == 0 and year_end == len(self.sorted_years))
+
+        # number of candidate rows of every set filter
+        sizes = {}
+        if platform_codes is not None:
+            sizes['platform'] = sum(self.platform_rows[code].size for code in platform_codes)
+        if genre_codes is not None:
+            sizes['genre'] = sum(self.genre_rows[code].size for code in genre_codes)
+        if years_selected:
+            sizes['year'] = max(year_end - year_start, 0)
+        if not sizes:
+            return None
+        smallest = min(sizes, key=sizes.get)
+        if sizes[smallest] == 0:
+            return np.empty(0, dtype=np.intp)
+
+        # take the rows of the most selective filter and check only them against the other filters
+        if smallest == 'platform':
+            rows = self._code_rows(self.platform_rows, platform_codes)
+        elif smallest == 'genre':
+            rows = self._code_rows(self.genre_rows, genre_codes)
+        else:
+            rows = np.sort(self.year_order[year_start:year_end])
+        mask = None
+        if smallest != 'platform' and platform_codes is not None:
+            mask = self._code_flags(self.platform_values, platform_codes)[self.platform_codes[rows]]
+        if smallest != 'genre' and genre_codes is not None:
+            genre_mask = self._code_flags(self.genre_values, genre_codes)[self.genre_codes[rows]]
+            mask = genre_mask if mask is None else mask & genre_mask
+        if smallest != 'year' and years_selected:
+            row_years = self.years[rows]
+            year_mask = (row_years >= start_year) & (row_years <= end_year)
+            mask = year_mask if mask is None else mask & year_mask
+        return rows if mask is None else rows[mask]
@@ -0,0 +1,159 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, without it the CSV is parsed on every start
+    feather = None
+
+
+# columns of games.csv used by the dashboard and their types while reading, before cleaning;
+# the years and the scores may contain 'tbd' and missing values, so they are read as strings and cleaned
+# before they get their final types
+raw_games_dtypes = {
+    'Name': object,
+    'Platform': object,
+    'Year_of_Release': object,
+    'Genre': object,
+    'Critic_Score': object,
+    'User_Score': object,
+    'Rating': object,
+}
+
+# number of rows read and cleaned at once, which bounds the memory used for the raw rows
+games_chunk_rows = int(os.environ.get('GAMES_CSV_CHUNK_ROWS', 100_000))
+
+# compact types of the cleaned dataset: categories for the repeated strings, small numbers for the rest
+games_dtypes = {
+    'Platform': 'category',
+    'Year_of_Release': 'int16',
+    'Genre': 'category',
+    'Critic_Score': 'float32',
+    'User_Score': 'float32',
+    'Rating': 'category',
+}
+
+
+# define a function that cleans the raw games dataset
+def clean_games(raw_df):
+    df = (
+        raw_df
+        .replace('tbd', pd.NA)
+        .dropna())
+    df['Year_of_Release'] = pd.to_numeric(df['Year_of_Release'], errors='coerce')
+    df = df.query("Year_of_Release>=2000 and Year_of_Release<2022")
+    # remove rows with 'RP' ('Rating Pending') in the 'Rating' column and 'tbd' ('to be determined') in any column
+    # because these data gaps influences the overall metrics.
+    df = df[df['Rating'] != 'RP']
+
+    df["User_Score"] = pd.to_numeric(df["User_Score"], errors='coerce')
+    df["Critic_Score"] = pd.to_numeric(df["Critic_Score"], errors='coerce')
+    return df.astype(games_dtypes)
+
+
+# define a function that reads games.csv in chunks and returns the cleaned chunks one by one,
+# so that only one chunk of raw rows is in memory at a time
+def read_games_chunks(csv_path, chunk_rows=None):
+    with pd.read_csv(csv_path,
+                     usecols=list(raw_games_dtypes),
+                     dtype=raw_games_dtypes,
+                     chunksize=chunk_rows or games_chunk_rows) as reader:
+        for raw_chunk in reader:
+            yield clean_games(raw_chunk)
+
+
+# define a function that joins cleaned chunks into one dataset; the categories of the chunks differ,
+# so every categorical column is joined with the union of the categories to keep the compact type
+def concat_games(chunks):
+    chunks = list(chunks)
+    if not chunks:
+        return clean_games(pd.DataFrame(columns=list(raw_games_dtypes)).astype(raw_games_dtypes))
+    columns = {}
+    for column, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+        else:
+            columns[column] = np.concatenate([chunk[column].to_numpy() for chunk in chunks])
+    return pd.DataFrame(columns)
+
+
+# define a function that reads and cleans games.csv chunk by chunk, the peak memory follows the chunk size
+# and the size of the cleaned dataset instead of the size of the file
+def read_games(csv_path, chunk_rows=None):
+    return concat_games(read_games_chunks(csv_path, chunk_rows))
+
+
+# define a function that returns the hash of a file's content, or of its first size bytes
+def get_file_hash(path, size=None):
+    file_hash = hashlib.sha256()
+    remaining_size = float('inf') if size is None else size
+    with open(path, 'rb') as file:
+        while remaining_size > 0:
+            block = file.read(int(min(1 << 20, remaining_size)))
+            if not block:
+                break
+            file_hash.update(block)
+            remaining_size -= len(block)
+    return file_hash.hexdigest()
+
+
+# define a function that returns the path of the columnar copy of the cleaned dataset for a CSV file;
+# the name contains the hash of the CSV, so a changed CSV never matches an old copy
+def get_cache_path(csv_path, cache_directory=None, file_hash=None):
+    if cache_directory is None:
+        cache_directory = os.environ.get('GAMES_DATA_CACHE_DIR',
+                                         os.path.join(os.path.dirname(csv_path) or '.', '.cache'))
+    csv_name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_directory, f'{csv_name}-{(file_hash or get_file_hash(csv_path))[:16]}.feather')
+
+
+# define a function that writes the cleaned dataset to an uncompressed Feather (Arrow IPC) file
+def write_cache(df, cache_path):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # write to a temporary file first, so that other workers never read a partially written copy
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+    os.close(file_descriptor)
+    try:
+        feather.write_feather(df.reset_index(drop=True), temporary_path, compression='uncompressed')
+        os.replace(temporary_path, cache_path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+# define a function that loads the cleaned games dataset: from the columnar copy if the CSV didn't change
+# since it was written, otherwise by parsing and cleaning the CSV; the copy is read through a memory map
+# but converted into a DataFrame in the memory of the process;
+# the hash of the CSV can be given if it is already known
+def load_games(csv_path, file_hash=None):
+    if feather is None:
+        return read_games(csv_path)
+
+    cache_path = get_cache_path(csv_path, file_hash=file_hash)
+    if os.path.exists(cache_path):
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df = read_games(csv_path)
+    try:
+        write_cache(df, cache_path)
+    except OSError:
+        # a read-only deployment still works, it only parses the CSV on every start
+        pass
+    return df
+
+
+# define a function that reads and cleans the rows appended to games.csv after the first offset bytes;
+# only complete lines are read, so the function also returns the offset up to which the file was read
+def read_appended_games(csv_path, offset):
+    with open(csv_path, 'rb') as file:
+        header = file.readline()
+        file.seek(offset)
+        appended_bytes = file.read()
+    appended_size = appended_bytes.rfind(b'\n') + 1
+    return read_games(io.BytesIO(header + appended_bytes[:appended_size])), offset + appended_size
@@ -1,34 +1,182 @@
-from dash import Dash, html, dash_table, dcc, callback, Output, Input
+from dash import (Dash, html, dash_table, dcc, callback, clientside_callback, no_update, ClientsideFunction,
+                  DiskcacheManager, Output, Input, Patch, State)
+import numpy as np
+import os
 import pandas as pd
 import plotly.express as px
 
+from cache_warmer import CacheWarmer, get_common_selections
+from clientside_data import encode_games
+from compression import init_compression
+from data_cube import register_dimension, register_measure
+from dashboard_data import CsvWatcher, DashboardData, DashboardDataStore
+from figure_patch import patch_figure
+from figure_templates import build_figure, empty_figures
+from instrumentation import (init_instrumentation, init_logging, init_sent_size_metrics, instrumented_callback, timed,
+                             without_recording)
+from selection_cache import LRUCache, cached_by_selection, make_cache
 
-# clean data
-df = (
-    pd.read_csv('games.csv')
-    .replace('tbd', pd.NA)
-    .dropna()
-    .query("Year_of_Release>=2000 and Year_of_Release<2022"))
-# remove rows with 'RP' ('Rating Pending') in the 'Rating' column and 'tbd' ('to be determined') in any column
-# because these data gaps influences the overall metrics.
-df = df[df['Rating'] != 'RP']
-
-# constants for layout visuals
-all_games_number = df.shape[0]
-df["User_Score"] = pd.to_numeric(df["User_Score"], errors='coerce')
-all_average_user_score = round(df["User_Score"].mean(numeric_only=True),2)
-df["Critic_Score"] = pd.to_numeric(df["Critic_Score"], errors='coerce')
-all_average_critic_score = df["Critic_Score"].mean(numeric_only=True)
-platforms_list = df["Platform"].unique().tolist()
-genres_list = df["Genre"].unique().tolist()
+
+# constants for layout visuals; every platform and genre keeps its color whatever else is selected,
+# so that traces can be added to a shown graph
+platforms_color_sequence = px.colors.qualitative.G10
 genres_color_sequence = px.colors.qualitative.Plotly
-genres_color_map = {genre: genres_color_sequence[i % len(genres_color_sequence)] for i, genre in enumerate(genres_list)}
 
-# initialize the dashboard app
-app = Dash(meta_tags=[{"content": "width=device-width"}])
+rating_to_age = {
+    'AO': 18,
+    'M': 17,
+    'T': 13,
+    'E10+': 10,
+    'E': 6,
+    'K-A': 6,
+    'EC': 3
+}
+
+# dimensions and measures of the data cube, registered once before the data is loaded; the metrics and
+# the aggregate graphs ask the cube for measures grouped by dimensions, over the cells matching the filters.
+# The age rating is derived from the rating once when the rows are loaded. The user scores have one decimal,
+# the critic scores and the ages none: the cube sums them exactly, whatever their compact storage type is
+register_dimension('Platform', 'Platform')
+register_dimension('Genre', 'Genre')
+register_dimension('Rating', 'Rating')
+register_dimension('Year', 'Year_of_Release', kind='range')
+register_measure('games_number', 'count')
+register_measure('average_user_score', 'mean', 'User_Score', decimals=1)
+register_measure('average_critic_score', 'mean', 'Critic_Score', decimals=0)
+register_measure('average_age_rating', 'mean', 'Age_Rating', decimals=0)
+
+# load the cleaned data, from the columnar copy of games.csv if it is up to date; the dataset, the filter index,
+# the cube and the values derived from them form one version of the dashboard data, which is replaced
+# as a whole when games.csv changes. Request code reads it with games_data.current
+games_csv_path = os.environ.get('GAMES_CSV', 'games.csv')
+games_data = DashboardDataStore(DashboardData.from_csv(games_csv_path,
+                                                       rating_to_age,
+                                                       {'Platform': platforms_color_sequence,
+                                                        'Genre': genres_color_sequence}))
+
+# above this number of points the scatter plot shows the density of games instead of single games,
+# the single games are shown after zooming in on a range with fewer points; the default is well above
+# the bundled games.csv, which is drawn game by game with WebGL, so only larger datasets switch to the density
+scatter_max_points = int(os.environ.get('GAMES_SCATTER_MAX_POINTS', 50000))
+scatter_density_bins = 40
+user_score_range = [0, 10]
+critic_score_range = [0, 100]
+
+# layout properties of the graphs that are built on the server and, in the clientside mode, in the browser
+stacked_area_plot_layout = dict(title="Number of games released by Year and Platform",
+                                title_size=15,
+                                xaxis_title="Year of release",
+                                yaxis_title="Number of games",
+                                legend_title="Platform")
+bar_chart_layout = dict(title='Average Age Rating by genre',
+                        title_size=15,
+                        xaxis_title='Genre',
+                        yaxis_title='Age',
+                        legend_title='Genre',
+                        barmode='relative')
+
+# bounded caches of filtered datasets (per process) and of rendered metrics and graphs
+# (shared between workers if GAMES_CACHE_DIR is set), keyed by the normalized selection and the data version
+filter_cache = LRUCache(maxsize=int(os.environ.get('GAMES_FILTER_CACHE_SIZE', 64)))
+dashboard_cache = make_cache(maxsize=int(os.environ.get('GAMES_DASHBOARD_CACHE_SIZE', 512)))
+
+# define a function that returns the version of the data used by the current request, part of the cache keys
+def get_data_version():
+    return games_data.current.version
+
+# entries of an old version are never used again, so the caches of the process are cleared when a new version
+# is swapped in; a cache shared by the workers is not, since another worker may have just written entries
+# of the new version to it, its old entries are removed by age and size instead
+games_data.on_swap(lambda data: [cache.clear() for cache in (filter_cache, dashboard_cache) if not cache.shared])
+
+# with GAMES_RELOAD_INTERVAL set, games.csv is checked every that many seconds; a changed file is loaded
+# by a background thread and swapped in, rows appended at the end are added without a full rebuild
+reload_interval = float(os.environ.get('GAMES_RELOAD_INTERVAL', 0))
+csv_watcher = CsvWatcher(games_csv_path, games_data, reload_interval) if reload_interval > 0 else None
+
+# in the clientside mode the dataset is sent to the browser once, where the metrics, the stacked area plot
+# and the bar chart are computed without a request; it is enabled by GAMES_CLIENTSIDE_MAX_ROWS and used for
+# every data version that is not larger, bigger versions are answered by the server
+clientside_max_rows = int(os.environ.get('GAMES_CLIENTSIDE_MAX_ROWS', 0))
+clientside = clientside_max_rows > 0
+
+# define a function that checks if a data version is small enough to be sent to the browser;
+# a reloaded version may have grown past the limit, its pages then fall back to the server callbacks
+def use_clientside(data):
+    return 0 < data.all_games_number <= clientside_max_rows
 
-# dashboard layout
-app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
+# the data of the clientside mode of the current version, encoded once instead of on every page load
+clientside_data_cache = LRUCache(maxsize=1)
+games_data.on_swap(lambda data: clientside_data_cache.clear())
+
+# define a function that returns the data of the clientside mode: the compact columns of the dataset,
+# the colors and the empty figures that the browser fills; it is encoded once per data version
+def get_clientside_data(data):
+    clientside_data = clientside_data_cache.get(data.version)
+    if clientside_data is None:
+        clientside_data = encode_clientside_data(data)
+        clientside_data_cache.set(data.version, clientside_data)
+    return clientside_data
+
+# define a function that encodes the data of the clientside mode; the browser sums the scores and the age
+# ratings as integers scaled as in the data cube, so that it rounds the same averages as the server
+def encode_clientside_data(data):
+    return dict(encode_games(data.df),
+                scales={'user_score': data.data_cube.scales['User_Score'],
+                        'critic_score': data.data_cube.scales['Critic_Score'],
+                        'age_rating': data.data_cube.scales['Age_Rating']},
+                platform_colors=data.platforms_color_map,
+                genre_colors=data.genres_color_map,
+                figures={'area': build_figure([], **stacked_area_plot_layout),
+                         'bar': build_figure([], xaxis={'categoryorder': 'array', 'categoryarray': []},
+                                             **bar_chart_layout),
+                         'empty_area': empty_figures['area'],
+                         'empty_bar': empty_figures['bar']})
+
+# with GAMES_BACKGROUND_CALLBACKS=1 the callbacks of the heavy graphs run as background callbacks in processes
+# started by a diskcache-backed manager, so they don't block the request workers; a job still running when
+# the user changes the filters again is terminated by Dash when the new job is requested.
+# The jobs run in their own processes, so their results are only cached if GAMES_CACHE_DIR is set
+background_manager = None
+if os.environ.get('GAMES_BACKGROUND_CALLBACKS') == '1':
+    import diskcache
+
+    background_manager = DiskcacheManager(diskcache.Cache(
+        os.environ.get('GAMES_BACKGROUND_CACHE_DIR',
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'background'))))
+
+# initialize the dashboard app; the assets folder holds the functions of the clientside mode
+app = Dash(meta_tags=[{"content": "width=device-width"}],
+           assets_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets'))
+# callback responses are serialized by plotly's JSON encoder, which uses orjson if it is installed: numeric
+# arrays of the figures are then written in one call per array. Responses larger than GAMES_COMPRESS_MIN_SIZE
+# bytes are compressed with brotli or gzip; the size of the responses before and after the compression
+# is recorded per callback, which is why the sent sizes are recorded by a hook registered first
+init_sent_size_metrics(app.server)
+init_compression(app.server,
+                 algorithms=os.environ.get('GAMES_COMPRESS_ALGORITHMS', 'br,gzip').split(','),
+                 min_size=int(os.environ.get('GAMES_COMPRESS_MIN_SIZE', 1000)))
+# log the reports of the cache warm-up and of the data reloads
+init_logging()
+# time every phase of the callbacks, send the timings in the Server-Timing header and serve them on /metrics
+# and, with PROMETHEUS_MULTIPROC_DIR, sum them over the worker processes of the server
+metrics_snapshots = init_instrumentation(app.server,
+                                         caches={'filter': filter_cache, 'dashboard': dashboard_cache},
+                                         gauge_functions=[lambda: cache_warmer.gauges() if cache_warmer is not None
+                                                          else []])
+# the watcher thread is started by the first request of every worker process, after the fork
+if csv_watcher is not None:
+    app.server.before_request(csv_watcher.start)
+
+# define a function that returns the options of a filter dropdown
+def get_filter_options(values):
+    return [{'label': value, 'value': value} for value in values]
+
+# define a function for the dashboard layout; it is called for every page load, so that a new page
+# shows the filter options and the metrics of the current data version
+def serve_layout():
+    data = games_data.current
+    layout = html.Div(style={'backgroundColor': '#0F0F0F',
                              'color': 'black',
                              'padding': '20px'},
                       children=[
@@ -159,8 +307,7 @@ app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
                                     html.Div(
                                         dcc.Dropdown(
                                             id='platforms',
-                                            options=[{'label': platform, 'value': platform} for platform in
-                                                     platforms_list],
+                                            options=get_filter_options(data.platforms_list),
                                             placeholder="Select platform(s)",
                                             multi=True,
                                             value=None,
@@ -172,7 +319,7 @@ app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
                                     html.Div(
                                         dcc.Dropdown(
                                             id='genres',
-                                            options=[{'label': genre, 'value': genre} for genre in genres_list],
+                                            options=get_filter_options(data.genres_list),
                                             placeholder="Select genre(s)",
                                             multi=True,
                                             value=None,
@@ -213,7 +360,7 @@ app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
                                                        }
                                                 ),
 
-                                        html.P(id='games_number',children=str(all_games_number),
+                                        html.P(id='games_number',children=str(data.all_games_number),
                                                style={'textAlign': 'center',
                                                       'color': '#CECCE3',
                                                       'fontSize': 40,
@@ -237,7 +384,7 @@ app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
                                                 }
                                                 ),
 
-                                        html.P(id='average-user-score',children=str(all_average_user_score),
+                                        html.P(id='average-user-score',children=str(data.all_average_user_score),
                                                style={
                                                    'textAlign': 'center',
                                                    'color': '#CECCE3',
@@ -262,7 +409,7 @@ app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
                                                 }
                                                 ),
 
-                                        html.P(id='average-critic-score',children=str(all_average_critic_score),
+                                        html.P(id='average-critic-score',children=str(data.all_average_critic_score),
                                                style={
                                                    'textAlign': 'center',
                                                    'color': '#CECCE3',
@@ -310,279 +457,597 @@ app.layout = html.Div(style={'backgroundColor': '#0F0F0F',
                                         'margin-bottom': '5px',
                                         'margin-top': '0px',
                                         'padding': '0px',
-                                    })
+                                    }),
+                                # trace order and property signatures of the graphs shown in the browser,
+                                # used to send only the changes of the graphs on the next update
+                                dcc.Store(id='shown-figures'),
+                                # compact dataset of the clientside mode
+                                dcc.Store(id='games-data', data=get_clientside_data(data) if use_clientside(data) else None),
+                                # version of the data shown by the page, checked for a newer one if reloading is enabled
+                                dcc.Store(id='data-version', data=data.version),
+                                dcc.Interval(id='data-version-check',
+                                             interval=max(reload_interval, 1) * 1000,
+                                             disabled=csv_watcher is None)
 
                                 ])
+    return layout
+
+app.layout = serve_layout
+
+# define callback that refreshes the filter options, and with them all metrics and graphs,
+# when a newer version of the data was swapped in after the page was loaded
+@callback(
+    Output(component_id='platforms', component_property='options'),
+    Output(component_id='genres', component_property='options'),
+    Output(component_id='games-data', component_property='data'),
+    Output(component_id='data-version', component_property='data'),
+    Input(component_id='data-version-check', component_property='n_intervals'),
+    State(component_id='data-version', component_property='data'),
+    prevent_initial_call=True,
+)
+def refresh_data_version(n_intervals, shown_data_version):
+    data = games_data.current
+    if data.version == shown_data_version:
+        return no_update, no_update, no_update, no_update
+    return (get_filter_options(data.platforms_list),
+            get_filter_options(data.genres_list),
+            (get_clientside_data(data) if use_clientside(data) else None) if clientside else no_update,
+            data.version)
 
 
-# define a function for filtering the dataset based on selected filters
+# define a function for filtering the dataset based on selected filters;
+# the filtered dataset is shared by all panels, so it must not be modified
+@cached_by_selection(filter_cache, version=get_data_version)
 def apply_filters(selected_platforms,
                   selected_genres,
                   selected_start_year,
                   selected_end_year):
-    if not selected_platforms and not selected_genres and not selected_start_year and not selected_end_year:
-        return df.copy()
+    data = games_data.current
+    # the filter engine returns positions of the matching rows, or None if all rows match
+    selected_rows = data.filter_engine.select(selected_platforms,
+                                              selected_genres,
+                                              selected_start_year,
+                                              selected_end_year)
+    if selected_rows is None:
+        return data.df
+    if selected_rows.size == 0:
+        return pd.DataFrame()
+    return data.df.take(selected_rows)
 
-    if not selected_platforms:
-        selected_platforms = df['Platform'].unique()
+# define a function that returns the cells of the data cube matching the selected filters;
+# empty selections and missing years mean "no filter" for that dimension, as in apply_filters()
+def select_cube(selected_platforms,
+                selected_genres,
+                selected_start_year,
+                selected_end_year):
+    return games_data.current.data_cube.filter({'Platform': selected_platforms,
+                                                'Genre': selected_genres,
+                                                'Year': (selected_start_year or 2000, selected_end_year or 2022)})
 
-    if not selected_genres:
-        selected_genres = df['Genre'].unique()
+# define a function for the 'Total Number of Games' metric
+def apply_filters_to_games_number(selected_cube):
+    # handle the case where the selection is empty
+    if selected_cube.empty:
+        return str(0)
 
-    if not selected_start_year:
-        selected_start_year = '2000'
+    # calculate the metric
+    games_number = selected_cube.total('games_number')
+    return str(games_number)
 
-    if not selected_end_year:
-        selected_end_year = '2022'
+# define a function for the 'Total Average Player Rating' metric; the filtered rows are only used
+# if the average is halfway between two rounded values (see CubeSlice.rounded_total)
+def apply_filters_to_average_user_score(selected_cube, get_filtered_df=None):
+    if selected_cube.empty:
+        return str(0)
 
-    if isinstance(selected_platforms, str):
-        selected_platforms = [selected_platforms]
+    average_user_score = selected_cube.rounded_total('average_user_score', 2,
+                                                     get_filtered_df and (lambda: get_filtered_df()['User_Score']))
+    return str(average_user_score)
 
-    if isinstance(selected_genres, str):
-        selected_genres = [selected_genres]
+# define a function for the 'Total Average Critic Rating' metric
+def apply_filters_to_average_critic_score(selected_cube, get_filtered_df=None):
+    if selected_cube.empty:
+        return str(0)
 
-    filtered_df_by_platform = df[df['Platform'].isin(selected_platforms)]
-    filtered_df_by_platform_genre = filtered_df_by_platform[filtered_df_by_platform['Genre'].isin(selected_genres)]
-    filtered_df_by_platform_genre_year = (
-        filtered_df_by_platform_genre.query(f"Year_of_Release>={selected_start_year} and Year_of_Release<={selected_end_year}"))
-    if filtered_df_by_platform_genre_year.empty:
-        return pd.DataFrame()
-    return filtered_df_by_platform_genre_year.copy()
+    average_critic_score = selected_cube.rounded_total('average_critic_score', 2,
+                                                       get_filtered_df and (lambda: get_filtered_df()['Critic_Score']))
+    return str(average_critic_score)
 
-# define callback for the 'Total Number of Games' metric
-@callback(
-    Output(component_id='games_number', component_property='children'),
-    Input(component_id='platforms', component_property='value'),
-    Input(component_id='genres', component_property='value'),
-    Input(component_id='start-year', component_property='value'),
-    Input(component_id='end-year', component_property='value'),
-)
-def apply_filters_to_games_number(selected_platforms,
-                                  selected_genres,
-                                  selected_start_year,
-                                  selected_end_year):
-    # call the apply_filters() function that returns filtered dataset
-    filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
-                                                       selected_genres,
-                                                       selected_start_year,
-                                                       selected_end_year)
-
-    # handle the case where the returned dataset is empty
-    if filtered_df_by_platform_genre_year.empty:
-        return str(0)
 
-    # calculate the metric
-    games_number = filtered_df_by_platform_genre_year.shape[0]
-    return str(games_number)
+# define a function that splits row positions by the values of a column, in the order of first appearance
+def split_rows_by(column):
+    codes, values = pd.factorize(column)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=len(values)))[:-1]
+    return zip(values, np.split(order, bounds))
 
-# define callback for the 'Total Average Player Rating' metric
-@callback(
-    Output(component_id='average-user-score', component_property='children'),
-    Input(component_id='platforms', component_property='value'),
-    Input(component_id='genres', component_property='value'),
-    Input(component_id='start-year', component_property='value'),
-    Input(component_id='end-year', component_property='value'),
-)
-def apply_filters_to_average_user_score(selected_platforms,
-                                        selected_genres,
-                                        selected_start_year,
-                                        selected_end_year):
-    filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
-                                                       selected_genres,
-                                                       selected_start_year,
-                                                       selected_end_year)
+# define a function for the 'Number of games released by Year and Platform' stacked area plot
+def display_stacked_area_plot(selected_cube):
+    if selected_cube.empty:
+        return empty_figures['area']
 
+    platforms_color_map = games_data.current.platforms_color_map
+    grouped_df = selected_cube.query(['Year', 'Platform'], ['games_number'])
+    years = grouped_df['Year'].to_numpy()
+    games_counts = grouped_df['games_number'].to_numpy()
+    traces = []
+    for platform, rows in split_rows_by(grouped_df['Platform']):
+        traces.append({
+            'type': 'scatter',
+            'x': years[rows],
+            'y': games_counts[rows],
+            'name': platform,
+            'legendgroup': platform,
+            'line': {'color': platforms_color_map.get(platform)},
+            'marker': {'symbol': 'circle'},
+            'mode': 'lines+markers',
+            'stackgroup': '1',
+            'fillpattern': {'shape': ''},
+            'orientation': 'v',
+            'showlegend': True,
+            'hovertemplate': f'Platform={platform}<br>Year of release=%{{x}}<br>Number of games=%{{y}}<extra></extra>',
+            'xaxis': 'x',
+            'yaxis': 'y',
+        })
+    return build_figure(traces, **stacked_area_plot_layout)
+
+# define a function for the 'Relationship between player and critic scores by genre' scatter plot;
+# if the ranges are given, only the games in the visible range are shown
+def display_scatter_plot(filtered_df_by_platform_genre_year, user_score_visible_range=None, critic_score_visible_range=None):
     if filtered_df_by_platform_genre_year.empty:
-        return str(0)
+        return empty_figures['scatter']
 
-    filtered_df_by_platform_genre_year["User_Score"] = pd.to_numeric(filtered_df_by_platform_genre_year["User_Score"],
-                                                                     errors='coerce')
-    average_user_score = round(filtered_df_by_platform_genre_year["User_Score"].mean(), 2)
-    return str(average_user_score)
+    zoomed = user_score_visible_range is not None
+    if zoomed:
+        visible_rows = (filtered_df_by_platform_genre_year["User_Score"].between(*user_score_visible_range)
+                        & filtered_df_by_platform_genre_year["Critic_Score"].between(*critic_score_visible_range))
+        filtered_df_by_platform_genre_year = filtered_df_by_platform_genre_year[visible_rows]
 
-# define callback for the 'Total Average Critic Rating' metric
-@callback(
-    Output(component_id='average-critic-score', component_property='children'),
-    Input(component_id='platforms', component_property='value'),
-    Input(component_id='genres', component_property='value'),
-    Input(component_id='start-year', component_property='value'),
-    Input(component_id='end-year', component_property='value'),
-)
-def apply_filters_to_average_critic_score(selected_platforms,
-                                        selected_genres,
-                                        selected_start_year,
-                                        selected_end_year):
-    filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
-                                                       selected_genres,
-                                                       selected_start_year,
-                                                       selected_end_year)
+    if filtered_df_by_platform_genre_year.shape[0] > scatter_max_points:
+        return display_scatter_density_plot(filtered_df_by_platform_genre_year,
+                                            user_score_visible_range or user_score_range,
+                                            critic_score_visible_range or critic_score_range,
+                                            zoomed)
 
-    if filtered_df_by_platform_genre_year.empty:
-        return str(0)
+    # WebGL keeps the browser responsive with many points, as plotly express does above 1000 points
+    webgl = zoomed or filtered_df_by_platform_genre_year.shape[0] > 1000
+    user_scores = filtered_df_by_platform_genre_year["User_Score"].to_numpy()
+    critic_scores = filtered_df_by_platform_genre_year["Critic_Score"].to_numpy()
+    data = games_data.current
+    # fetch the names of the shown games only; as a fixed-width string array they are serialized
+    # by orjson in one call instead of element by element like an object array
+    names = data.names.to_numpy()[filtered_df_by_platform_genre_year.index.to_numpy()].astype(str)
+    traces = []
+    for genre, rows in split_rows_by(filtered_df_by_platform_genre_year["Genre"]):
+        trace = {
+            'type': 'scattergl' if webgl else 'scatter',
+            'x': user_scores[rows],
+            'y': critic_scores[rows],
+            'hovertext': names[rows],
+            'name': genre,
+            'legendgroup': genre,
+            'marker': {'color': data.genres_color_map.get(genre), 'symbol': 'circle'},
+            'mode': 'markers',
+            'showlegend': True,
+            'hovertemplate': f'<b>%{{hovertext}}</b><br><br>Genre={genre}<br>User Score=%{{x}}<br>Critic Score=%{{y}}<extra></extra>',
+            'xaxis': 'x',
+            'yaxis': 'y',
+        }
+        if not webgl:
+            trace['orientation'] = 'v'
+        traces.append(trace)
+    return build_figure(traces,
+                        title="Relationship between player and critic scores by genre",
+                        title_size=13,
+                        xaxis_title="User Score",
+                        yaxis_title="Critic Score",
+                        legend_title="Genre",
+                        **get_zoomed_ranges(zoomed, user_score_visible_range, critic_score_visible_range))
 
-    filtered_df_by_platform_genre_year["Critic_Score"] = pd.to_numeric(filtered_df_by_platform_genre_year["Critic_Score"],
-                                                                     errors='coerce')
-    average_critic_score = round(filtered_df_by_platform_genre_year["Critic_Score"].mean(), 2)
-    return str(average_critic_score)
+# define a function for the density version of the scatter plot: the games of every genre are counted
+# on a grid over the visible range and every non-empty grid cell is shown as one point sized by the count
+def display_scatter_density_plot(filtered_df_by_platform_genre_year, user_score_visible_range, critic_score_visible_range,
+                                 zoomed=False):
+    genres_color_map = games_data.current.genres_color_map
+    traces = []
+    for genre, rows in split_rows_by(filtered_df_by_platform_genre_year["Genre"]):
+        genre_df = filtered_df_by_platform_genre_year.iloc[rows]
+        games_number, user_score_edges, critic_score_edges = np.histogram2d(genre_df["User_Score"],
+                                                                            genre_df["Critic_Score"],
+                                                                            bins=scatter_density_bins,
+                                                                            range=[user_score_visible_range,
+                                                                                   critic_score_visible_range])
+        user_score_cells, critic_score_cells = np.nonzero(games_number)
+        cell_games_number = games_number[user_score_cells, critic_score_cells]
+        traces.append({
+            'type': 'scattergl',
+            'x': (user_score_edges[user_score_cells] + user_score_edges[user_score_cells + 1]) / 2,
+            'y': (critic_score_edges[critic_score_cells] + critic_score_edges[critic_score_cells + 1]) / 2,
+            'customdata': cell_games_number,
+            'mode': 'markers',
+            'name': genre,
+            'marker': {'color': genres_color_map.get(genre),
+                       'size': 4 + 12 * np.sqrt(cell_games_number / cell_games_number.max()),
+                       'opacity': 0.7},
+            'hovertemplate': f"<b>{genre}</b><br>User Score=%{{x:.2f}}<br>Critic Score=%{{y:.1f}}"
+                             "<br>Number of games=%{customdata:.0f}<extra></extra>",
+        })
+    return build_figure(traces,
+                        title="Relationship between player and critic scores by genre (zoom in to see single games)",
+                        title_size=13,
+                        xaxis_title="User Score",
+                        yaxis_title="Critic Score",
+                        legend_title="Genre",
+                        **get_zoomed_ranges(zoomed, user_score_visible_range, critic_score_visible_range))
 
+# define a function that returns the axes ranges of a zoomed scatter plot as layout properties
+def get_zoomed_ranges(zoomed, user_score_visible_range, critic_score_visible_range):
+    if not zoomed:
+        return {}
+    return {'xaxis': {'range': user_score_visible_range}, 'yaxis': {'range': critic_score_visible_range}}
 
-# define callback for the 'Number of games released by Year and Platform' stacked area plot
-@callback(
-    Output(component_id="stacked-area-plot", component_property="figure"),
-    Input(component_id='platforms', component_property='value'),
-    Input(component_id='genres', component_property='value'),
-    Input(component_id='start-year', component_property='value'),
-    Input(component_id='end-year', component_property='value'),
-)
-def display_stacked_area_plot(selected_platforms,
-                              selected_genres,
-                              selected_start_year,
-                              selected_end_year):
-    filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
-                                                       selected_genres,
-                                                       selected_start_year,
-                                                       selected_end_year)
-    if filtered_df_by_platform_genre_year.empty:
-        fig = px.area(title="No data")
-        fig.update_layout(
-            paper_bgcolor='#1e1e1e',
-            plot_bgcolor='#1e1e1e',
-            font=dict(color='#CECCE3'),
-            xaxis_title_font=dict(color='#CECCE3'),
-            yaxis_title_font=dict(color='#CECCE3'),
-            title_font=dict(color='#CECCE3'))
-        return fig
-
-    grouped_df = filtered_df_by_platform_genre_year.groupby(['Year_of_Release', 'Platform']).size().reset_index(
-        name='Game_Count')
-    fig = px.area(grouped_df,
-                  x="Year_of_Release",
-                  y="Game_Count",
-                  color="Platform",
-                  color_discrete_sequence=px.colors.qualitative.G10,
-                  labels={"Game_Count": "Number of games", "Year_of_Release": "Year of release"},
-                  markers=True,
-                  title="Number of games released by Year and Platform")
-    fig.update_layout(
-        paper_bgcolor='#1e1e1e',
-        plot_bgcolor='#1e1e1e',
-        font=dict(color='#CECCE3'),
-        xaxis_title_font=dict(color='#CECCE3'),
-        yaxis_title_font=dict(color='#CECCE3'),
-        title_font=dict(color='#CECCE3',size=15))
-
-    return fig
-
-# define callback for the 'Relationship between player and critic scores by genre' scatter plot
-@callback(
-    Output(component_id="scatter-plot", component_property="figure"),
-    Input(component_id='platforms', component_property='value'),
-    Input(component_id='genres', component_property='value'),
-    Input(component_id='start-year', component_property='value'),
-    Input(component_id='end-year', component_property='value'),
-)
-def display_scatter_plot(selected_platforms,
-                              selected_genres,
-                              selected_start_year,
-                              selected_end_year):
-    filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
-                                                       selected_genres,
-                                                       selected_start_year,
-                                                       selected_end_year)
-    if filtered_df_by_platform_genre_year.empty:
-        fig = px.scatter(title="No data")
-        fig.update_layout(
-            paper_bgcolor='#1e1e1e',
-            plot_bgcolor='#1e1e1e',
-            font=dict(color='#CECCE3'),
-            xaxis_title_font=dict(color='#CECCE3'),
-            yaxis_title_font=dict(color='#CECCE3'),
-            title_font=dict(color='#CECCE3'))
-        return fig
-
-    fig = px.scatter(filtered_df_by_platform_genre_year,
-                     x="User_Score",
-                     y="Critic_Score",
-                     color="Genre",
-                     color_discrete_map=genres_color_map,
-                     hover_name="Name",
-                     labels={"Name": "Name", "User_Score": "User Score", "Critic_Score": "Critic Score", "Genre": "Genre"},
-                     title="Relationship between player and critic scores by genre",
-                     )
-    fig.update_layout(
-        paper_bgcolor='#1e1e1e',
-        plot_bgcolor='#1e1e1e',
-        font=dict(color='#CECCE3'),
-        xaxis_title_font=dict(color='#CECCE3'),
-        yaxis_title_font=dict(color='#CECCE3'),
-        title_font=dict(color='#CECCE3',size=13))
-    return fig
-
-# define callback for the 'Average Age Rating by genre' bar chart
+# define a function for the 'Average Age Rating by genre' bar chart
+def display_bar_chart(selected_cube):
+    if selected_cube.empty:
+        return empty_figures['bar']
+
+    # calculate the average age rating by Genre; the stable sort keeps equal averages in the order of the genres,
+    # as the browser does in the clientside mode
+    average_age_rating = (selected_cube
+                          .query(['Genre'], ['average_age_rating'])
+                          .sort_values(by='average_age_rating', kind='stable'))
+    average_age_rating['average_age_rating'] = average_age_rating['average_age_rating'].astype(int)
+    genres_color_map = games_data.current.genres_color_map
+
+    traces = []
+    for genre, age_rating in zip(average_age_rating['Genre'], average_age_rating['average_age_rating'].tolist()):
+        traces.append({
+            'type': 'bar',
+            'x': [genre],
+            'y': [age_rating],
+            'text': [age_rating],
+            'textposition': 'auto',
+            'name': genre,
+            'legendgroup': genre,
+            'offsetgroup': genre,
+            'alignmentgroup': 'True',
+            'marker': {'color': genres_color_map.get(genre), 'pattern': {'shape': ''}},
+            'orientation': 'v',
+            'showlegend': True,
+            'hovertemplate': 'Genre=%{x}<br>Age=%{text}<extra></extra>',
+            'xaxis': 'x',
+            'yaxis': 'y',
+        })
+    return build_figure(traces,
+                        xaxis={'categoryorder': 'array', 'categoryarray': average_age_rating['Genre'].tolist()},
+                        **bar_chart_layout)
+
+# define a function for all metrics and graphs of a selection;
+# metrics and aggregate graphs are answered by the data cube, only the scatter plot needs filtered rows
+@cached_by_selection(dashboard_cache, version=get_data_version)
+def build_dashboard(selected_platforms,
+                    selected_genres,
+                    selected_start_year,
+                    selected_end_year):
+    with timed('build_dashboard', 'cube'):
+        selected_cube = select_cube(selected_platforms,
+                                    selected_genres,
+                                    selected_start_year,
+                                    selected_end_year)
+    with timed('build_dashboard', 'filter'):
+        filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
+                                                           selected_genres,
+                                                           selected_start_year,
+                                                           selected_end_year)
+    with timed('build_dashboard', 'metrics'):
+        metrics = (apply_filters_to_games_number(selected_cube),
+                   apply_filters_to_average_user_score(selected_cube, lambda: filtered_df_by_platform_genre_year),
+                   apply_filters_to_average_critic_score(selected_cube, lambda: filtered_df_by_platform_genre_year))
+
+    with timed('build_dashboard', 'stacked_area_plot'):
+        stacked_area_plot = display_stacked_area_plot(selected_cube)
+    with timed('build_dashboard', 'scatter_plot'):
+        scatter_plot = display_scatter_plot(filtered_df_by_platform_genre_year)
+    with timed('build_dashboard', 'bar_chart'):
+        bar_chart = display_bar_chart(selected_cube)
+    return metrics + (stacked_area_plot, scatter_plot, bar_chart)
+
+# define a function for the metrics and the bar chart of a selection, which only need the data cube;
+# used when the other graphs are built by a background callback
+@cached_by_selection(dashboard_cache, version=get_data_version)
+def build_metrics_and_bar_chart(selected_platforms,
+                                selected_genres,
+                                selected_start_year,
+                                selected_end_year):
+    with timed('build_metrics_and_bar_chart', 'cube'):
+        selected_cube = select_cube(selected_platforms,
+                                    selected_genres,
+                                    selected_start_year,
+                                    selected_end_year)
+    # the rows are only filtered in the rare case of an average halfway between two rounded values
+    def get_filtered_df():
+        return apply_filters(selected_platforms, selected_genres, selected_start_year, selected_end_year)
+
+    with timed('build_metrics_and_bar_chart', 'metrics'):
+        metrics = (apply_filters_to_games_number(selected_cube),
+                   apply_filters_to_average_user_score(selected_cube, get_filtered_df),
+                   apply_filters_to_average_critic_score(selected_cube, get_filtered_df))
+    with timed('build_metrics_and_bar_chart', 'bar_chart'):
+        return metrics + (display_bar_chart(selected_cube),)
+
+# define a function for the scatter plot of a selection alone, used in the clientside mode
+@cached_by_selection(dashboard_cache, version=get_data_version)
+def build_scatter_plot(selected_platforms,
+                       selected_genres,
+                       selected_start_year,
+                       selected_end_year):
+    with timed('build_scatter_plot', 'filter'):
+        filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
+                                                           selected_genres,
+                                                           selected_start_year,
+                                                           selected_end_year)
+    with timed('build_scatter_plot', 'scatter_plot'):
+        return display_scatter_plot(filtered_df_by_platform_genre_year)
+
+# define a function that replaces the figures, given by graph id, with patches of the figures shown in the browser
+# and returns the data of the 'shown-figures' store after the update; the store keeps the signatures
+# of the shown figures (see patch_figure), a graph without them is sent whole
+def patch_shown_graphs(figures, shown_figures):
+    new_shown_figures = {}
+    for graph_id, figure in figures.items():
+        figures[graph_id], new_shown_figures[graph_id] = patch_figure((shown_figures or {}).get(graph_id), figure)
+    return new_shown_figures
+
+if clientside:
+    # metrics, stacked area plot and bar chart are computed in the browser from the 'games-data' store
+    clientside_callback(
+        ClientsideFunction(namespace='games', function_name='update_dashboard'),
+        Output(component_id='games_number', component_property='children'),
+        Output(component_id='average-user-score', component_property='children'),
+        Output(component_id='average-critic-score', component_property='children'),
+        Output(component_id="stacked-area-plot", component_property="figure"),
+        Output(component_id="bar-chart", component_property="figure"),
+        Input(component_id='platforms', component_property='value'),
+        Input(component_id='genres', component_property='value'),
+        Input(component_id='start-year', component_property='value'),
+        Input(component_id='end-year', component_property='value'),
+        Input(component_id='data-version', component_property='data'),
+        State(component_id='games-data', component_property='data'),
+    )
+
+    # define callback for the scatter plot, which needs the games of the selection and stays on the server
+    @callback(
+        Output(component_id="scatter-plot", component_property="figure"),
+        Output(component_id='shown-figures', component_property='data'),
+        Input(component_id='platforms', component_property='value'),
+        Input(component_id='genres', component_property='value'),
+        Input(component_id='start-year', component_property='value'),
+        Input(component_id='end-year', component_property='value'),
+        Input(component_id='data-version', component_property='data'),
+        State(component_id='shown-figures', component_property='data'),
+        background=background_manager is not None,
+        manager=background_manager,
+    )
+    @instrumented_callback
+    def update_scatter_plot(selected_platforms,
+                            selected_genres,
+                            selected_start_year,
+                            selected_end_year,
+                            data_version,
+                            shown_figures=None):
+        figures = {'scatter-plot': build_scatter_plot(selected_platforms,
+                                                      selected_genres,
+                                                      selected_start_year,
+                                                      selected_end_year)}
+        with timed('update_scatter_plot', 'patch'):
+            new_shown_figures = patch_shown_graphs(figures, shown_figures)
+        return figures['scatter-plot'], new_shown_figures
+
+    # define callback for the metrics, the stacked area plot and the bar chart of the data versions that are
+    # too large for the browser, whose pages get no 'games-data'; it does nothing for the other versions
+    @callback(
+        Output(component_id='games_number', component_property='children', allow_duplicate=True),
+        Output(component_id='average-user-score', component_property='children', allow_duplicate=True),
+        Output(component_id='average-critic-score', component_property='children', allow_duplicate=True),
+        Output(component_id="stacked-area-plot", component_property="figure", allow_duplicate=True),
+        Output(component_id="bar-chart", component_property="figure", allow_duplicate=True),
+        Input(component_id='platforms', component_property='value'),
+        Input(component_id='genres', component_property='value'),
+        Input(component_id='start-year', component_property='value'),
+        Input(component_id='end-year', component_property='value'),
+        Input(component_id='data-version', component_property='data'),
+        prevent_initial_call='initial_duplicate',
+    )
+    @instrumented_callback
+    def update_metrics_on_server(selected_platforms,
+                                 selected_genres,
+                                 selected_start_year,
+                                 selected_end_year,
+                                 data_version):
+        if use_clientside(games_data.current):
+            return no_update, no_update, no_update, no_update, no_update
+        metrics_and_bar_chart = build_metrics_and_bar_chart(selected_platforms,
+                                                            selected_genres,
+                                                            selected_start_year,
+                                                            selected_end_year)
+        with timed('update_metrics_on_server', 'stacked_area_plot'):
+            stacked_area_plot = display_stacked_area_plot(select_cube(selected_platforms,
+                                                                      selected_genres,
+                                                                      selected_start_year,
+                                                                      selected_end_year))
+        return metrics_and_bar_chart[:3] + (stacked_area_plot, metrics_and_bar_chart[3])
+elif background_manager is not None:
+    # define callback for the metrics and the bar chart, which are answered quickly by the data cube
+    @callback(
+        Output(component_id='games_number', component_property='children'),
+        Output(component_id='average-user-score', component_property='children'),
+        Output(component_id='average-critic-score', component_property='children'),
+        Output(component_id="bar-chart", component_property="figure"),
+        Input(component_id='platforms', component_property='value'),
+        Input(component_id='genres', component_property='value'),
+        Input(component_id='start-year', component_property='value'),
+        Input(component_id='end-year', component_property='value'),
+        Input(component_id='data-version', component_property='data'),
+    )
+    @instrumented_callback
+    def update_metrics(selected_platforms,
+                       selected_genres,
+                       selected_start_year,
+                       selected_end_year,
+                       data_version):
+        return build_metrics_and_bar_chart(selected_platforms,
+                                           selected_genres,
+                                           selected_start_year,
+                                           selected_end_year)
+
+    # define background callback for the stacked area and scatter plots, sent as patches of the shown figures
+    @callback(
+        Output(component_id="stacked-area-plot", component_property="figure"),
+        Output(component_id="scatter-plot", component_property="figure"),
+        Output(component_id='shown-figures', component_property='data'),
+        Input(component_id='platforms', component_property='value'),
+        Input(component_id='genres', component_property='value'),
+        Input(component_id='start-year', component_property='value'),
+        Input(component_id='end-year', component_property='value'),
+        Input(component_id='data-version', component_property='data'),
+        State(component_id='shown-figures', component_property='data'),
+        background=True,
+        manager=background_manager,
+    )
+    @instrumented_callback
+    def update_figures(selected_platforms,
+                       selected_genres,
+                       selected_start_year,
+                       selected_end_year,
+                       data_version,
+                       shown_figures=None):
+        figures = dict(zip(['stacked-area-plot', 'scatter-plot'], build_dashboard(selected_platforms,
+                                                                                   selected_genres,
+                                                                                   selected_start_year,
+                                                                                   selected_end_year)[3:5]))
+        with timed('update_figures', 'patch'):
+            new_shown_figures = patch_shown_graphs(figures, shown_figures)
+        return figures['stacked-area-plot'], figures['scatter-plot'], new_shown_figures
+else:
+    # define a single callback for all metrics and graphs, so that one interaction costs one request;
+    # the stacked area and scatter plots are sent as patches of the figures shown in the browser
+    @callback(
+        Output(component_id='games_number', component_property='children'),
+        Output(component_id='average-user-score', component_property='children'),
+        Output(component_id='average-critic-score', component_property='children'),
+        Output(component_id="stacked-area-plot", component_property="figure"),
+        Output(component_id="scatter-plot", component_property="figure"),
+        Output(component_id="bar-chart", component_property="figure"),
+        Output(component_id='shown-figures', component_property='data'),
+        Input(component_id='platforms', component_property='value'),
+        Input(component_id='genres', component_property='value'),
+        Input(component_id='start-year', component_property='value'),
+        Input(component_id='end-year', component_property='value'),
+        Input(component_id='data-version', component_property='data'),
+        State(component_id='shown-figures', component_property='data'),
+    )
+    @instrumented_callback
+    def update_dashboard(selected_platforms,
+                         selected_genres,
+                         selected_start_year,
+                         selected_end_year,
+                         data_version,
+                         shown_figures=None):
+        metrics_and_figures = build_dashboard(selected_platforms,
+                                              selected_genres,
+                                              selected_start_year,
+                                              selected_end_year)
+        figures = {'stacked-area-plot': metrics_and_figures[3], 'scatter-plot': metrics_and_figures[4]}
+        with timed('update_dashboard', 'patch'):
+            new_shown_figures = patch_shown_graphs(figures, shown_figures)
+        return (metrics_and_figures[:3]
+                + (figures['stacked-area-plot'], figures['scatter-plot'], metrics_and_figures[5], new_shown_figures))
+
+# define callback that shows the games in the zoomed range of the scatter plot,
+# if the whole selection was too large to be sent as single games;
+# the zoomed figure is not the figure of the selection, so the next update sends the whole scatter plot
 @callback(
-    Output(component_id="bar-chart", component_property="figure"),
-    Input(component_id='platforms', component_property='value'),
-    Input(component_id='genres', component_property='value'),
-    Input(component_id='start-year', component_property='value'),
-    Input(component_id='end-year', component_property='value'),
+    Output(component_id="scatter-plot", component_property="figure", allow_duplicate=True),
+    Output(component_id='shown-figures', component_property='data', allow_duplicate=True),
+    Input(component_id="scatter-plot", component_property="relayoutData"),
+    State(component_id='platforms', component_property='value'),
+    State(component_id='genres', component_property='value'),
+    State(component_id='start-year', component_property='value'),
+    State(component_id='end-year', component_property='value'),
+    prevent_initial_call=True,
 )
-def display_bar_chart(selected_platforms,
-                              selected_genres,
-                              selected_start_year,
-                              selected_end_year):
-    filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
-                                                       selected_genres,
-                                                       selected_start_year,
-                                                       selected_end_year)
-    if filtered_df_by_platform_genre_year.empty:
-        fig = px.bar(title="No data")
-        fig.update_layout(
-            paper_bgcolor='#1e1e1e',
-            plot_bgcolor='#1e1e1e',
-            font=dict(color='#CECCE3'),
-            xaxis_title_font=dict(color='#CECCE3'),
-            yaxis_title_font=dict(color='#CECCE3'),
-            title_font=dict(color='#CECCE3'))
-        return fig
-
-    rating_to_age = {
-        'AO': 18,
-        'M': 17,
-        'T': 13,
-        'E10+': 10,
-        'E': 6,
-        'K-A': 6,
-        'EC': 3
-    }
-
-    filtered_df_by_platform_genre_year['Age_Rating'] = filtered_df_by_platform_genre_year['Rating'].map(rating_to_age)
-    # Group by Genre and calculate the average age rating
-    average_age_rating = (filtered_df_by_platform_genre_year
-                          .groupby('Genre')['Age_Rating']
-                          .mean()
-                          .reset_index()
-                          .sort_values(by='Age_Rating'))
-    average_age_rating['Age_Rating'] = average_age_rating['Age_Rating'].astype(int)
-
-    fig = px.bar(average_age_rating,
-                 x='Genre',
-                 y='Age_Rating',
-                 labels={'Genre':'Genre','Age_Rating': 'Age'},
-                 title='Average Age Rating by genre',
-                 text='Age_Rating',
-                 color='Genre',
-                 color_discrete_map=genres_color_map)
-    fig.update_layout(
-        paper_bgcolor='#1e1e1e',
-        plot_bgcolor='#1e1e1e',
-        font=dict(color='#CECCE3'),
-        xaxis_title_font=dict(color='#CECCE3'),
-        yaxis_title_font=dict(color='#CECCE3'),
-        title_font=dict(color='#CECCE3',size=15)
-    )
+@instrumented_callback
+def zoom_scatter_plot(relayout_data,
+                      selected_platforms,
+                      selected_genres,
+                      selected_start_year,
+                      selected_end_year):
+    if not relayout_data:
+        return no_update, no_update
+
+    with timed('zoom_scatter_plot', 'filter'):
+        filtered_df_by_platform_genre_year = apply_filters(selected_platforms,
+                                                           selected_genres,
+                                                           selected_start_year,
+                                                           selected_end_year)
+    # single games are already in the browser, so the zoom is handled there
+    if filtered_df_by_platform_genre_year.shape[0] <= scatter_max_points:
+        return no_update, no_update
+
+    shown_figures = Patch()
+    shown_figures['scatter-plot'] = None
+    # zoomed out: return the density plot of the whole selection
+    if relayout_data.get('xaxis.autorange') or relayout_data.get('yaxis.autorange'):
+        return build_scatter_plot(selected_platforms,
+                                  selected_genres,
+                                  selected_start_year,
+                                  selected_end_year), shown_figures
+
+    user_score_visible_range = get_visible_range(relayout_data, 'xaxis')
+    critic_score_visible_range = get_visible_range(relayout_data, 'yaxis')
+    if user_score_visible_range is None and critic_score_visible_range is None:
+        return no_update, no_update
+    with timed('zoom_scatter_plot', 'scatter_plot'):
+        return display_scatter_plot(filtered_df_by_platform_genre_year,
+                                    user_score_visible_range or user_score_range,
+                                    critic_score_visible_range or critic_score_range), shown_figures
+
+# define a function that reads the visible range of an axis from the relayoutData of a graph
+def get_visible_range(relayout_data, axis):
+    if f'{axis}.range[0]' in relayout_data and f'{axis}.range[1]' in relayout_data:
+        return sorted([relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']])
+    if f'{axis}.range' in relayout_data:
+        return sorted(relayout_data[f'{axis}.range'])
+    return None
 
-    return fig
+# unless GAMES_WARM_CACHE=0 is set, the cached functions of the callbacks are called in the background
+# for the default state, every single platform, genre and year, after the start of every worker process
+# (on its first request or, with gunicorn, right after the fork) and after every data reload.
+# A warm-up runs on GAMES_WARM_THREADS threads and stops after GAMES_WARM_TIME_BUDGET seconds or when the
+# peak memory of the process grew by GAMES_WARM_MEMORY_BUDGET megabytes; the report is logged and on /metrics.
+# The warm-up calls are not recorded in the latency histograms of /metrics, which only hold the requests
+cache_warmer = None
+if os.environ.get('GAMES_WARM_CACHE', '1') == '1':
+    if clientside:
+        warmed_functions = [build_scatter_plot,
+                            lambda *selection: (None if use_clientside(games_data.current)
+                                                else build_metrics_and_bar_chart(*selection))]
+    elif background_manager is not None:
+        warmed_functions = [build_metrics_and_bar_chart, build_dashboard]
+    else:
+        warmed_functions = [build_dashboard]
+    cache_warmer = CacheWarmer([without_recording(function) for function in warmed_functions],
+                               lambda: get_common_selections(games_data.latest.platforms_list,
+                                                             games_data.latest.genres_list,
+                                                             range(2000, 2023)),
+                               lambda: games_data.latest.version,
+                               max_workers=int(os.environ.get('GAMES_WARM_THREADS', 2)),
+                               time_budget=float(os.environ.get('GAMES_WARM_TIME_BUDGET', 60)),
+                               memory_budget=float(os.environ.get('GAMES_WARM_MEMORY_BUDGET', 256)) * 2 ** 20)
+    app.server.before_request(cache_warmer.start)
+    games_data.on_swap(lambda data: cache_warmer.restart())
 
-# Run the app
+# Run the app with the development server; the debugger and the reloader are only enabled with GAMES_DEBUG=1,
+# production deployments serve wsgi.py with gunicorn or waitress
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=os.environ.get('GAMES_DEBUG') == '1')
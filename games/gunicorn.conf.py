@@ -0,0 +1,51 @@
+# gunicorn settings of the games dashboard: gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:create_app()'
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = f"{os.environ.get('GAMES_HOST', '0.0.0.0')}:{os.environ.get('GAMES_PORT', 8050)}"
+
+# the dataset is loaded once in the master before the workers are forked, so the workers share its pages
+# copy-on-write instead of each parsing games.csv; a worker gets its own copy of a page only when it writes to it
+preload_app = True
+workers = int(os.environ.get('GAMES_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# threads of a worker keep serving quick requests while another thread waits on a slow client
+worker_class = 'gthread'
+threads = int(os.environ.get('GAMES_THREADS', 4))
+timeout = 60
+
+
+# start the cache warm-up of every worker right after the fork, instead of on its first request;
+# its report is logged through the error log of gunicorn
+def post_fork(server, worker):
+    import games_market_dash_Evgeniia_Galiaukh as dashboard
+    from instrumentation import init_logging
+
+    init_logging(server.log.error_log.handlers)
+    if dashboard.cache_warmer is not None:
+        dashboard.cache_warmer.start()
+
+
+# with PROMETHEUS_MULTIPROC_DIR, remove the metrics files of a previous run before the workers start
+def on_starting(server):
+    from instrumentation import MetricsSnapshots, multiprocess_directory
+
+    if multiprocess_directory:
+        MetricsSnapshots(multiprocess_directory, None).clear()
+
+
+# write the last metrics of a worker before it exits, so that /metrics keeps its counts
+def worker_exit(server, worker):
+    import games_market_dash_Evgeniia_Galiaukh as dashboard
+
+    if dashboard.metrics_snapshots is not None:
+        dashboard.metrics_snapshots.write()
+
+
+# remove the gauges of an exited worker, its counters and histograms stay in the sums
+def child_exit(server, worker):
+    from instrumentation import MetricsSnapshots, multiprocess_directory
+
+    if multiprocess_directory:
+        MetricsSnapshots(multiprocess_directory, None).mark_process_dead(worker.pid)
@@ -0,0 +1,332 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import Response, g, has_request_context
+
+
+# upper bounds of the duration histogram buckets in seconds
+duration_buckets = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+# upper bounds of the response size histogram buckets in bytes
+size_buckets = [1000, 5000, 10000, 50000, 100000, 500000, 1000000, 5000000]
+# modules whose reports, like the cache warm-up and the data reloads, are logged by init_logging()
+logged_modules = ['cache_warmer', 'dashboard_data']
+# directory shared by the worker processes of a server, as in the multiprocess mode of prometheus_client:
+# every process writes its metrics there and /metrics reports the sums over all workers, whichever worker
+# answers the scrape; without it the metrics are those of the process answering the scrape
+multiprocess_directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+# seconds between two writes of the metrics of a process to the shared directory
+snapshot_interval = float(os.environ.get('GAMES_METRICS_SNAPSHOT_INTERVAL', 1.0))
+
+
+# durations of the phases of every callback as Prometheus histograms; the metrics are kept per process
+# and summed over the processes by MetricsSnapshots. The same histograms hold the sizes of the callback responses, with the stage instead of the phase as label
+class PhaseHistograms:
+    def __init__(self, buckets, label='phase', description='Duration of the phases of the dashboard callbacks.'):
+        self.buckets = buckets
+        self.label = label
+        self.description = description
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, callback_name, phase, duration):
+        bucket = bisect_left(self.buckets, duration)
+        with self._lock:
+            histogram = self._histograms.get((callback_name, phase))
+            if histogram is None:
+                histogram = self._histograms[(callback_name, phase)] = {
+                    'bucket_counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['bucket_counts'][bucket] += 1
+            histogram['sum'] += duration
+            histogram['count'] += 1
+
+    # return a copy of the histograms as a list of [callback_name, phase, histogram], which is valid JSON
+    def snapshot(self):
+        with self._lock:
+            return [[callback_name, phase, dict(histogram, bucket_counts=list(histogram['bucket_counts']))]
+                    for (callback_name, phase), histogram in self._histograms.items()]
+
+    # return the histograms in the Prometheus text exposition format, summed with the snapshots
+    # of the other processes if they are given
+    def to_prometheus(self, name='games_dashboard_phase_duration_seconds', other_snapshots=()):
+        lines = [f'# HELP {name} {self.description}',
+                 f'# TYPE {name} histogram']
+        histograms = {}
+        for snapshot in [self.snapshot(), *other_snapshots]:
+            for callback_name, phase, histogram in snapshot:
+                total = histograms.setdefault((callback_name, phase), {
+                    'bucket_counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0})
+                total['bucket_counts'] = [count + other_count for count, other_count
+                                          in zip(total['bucket_counts'], histogram['bucket_counts'])]
+                total['sum'] += histogram['sum']
+                total['count'] += histogram['count']
+        for (callback_name, phase), histogram in sorted(histograms.items()):
+            labels = f'callback="{callback_name}",{self.label}="{phase}"'
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(self.buckets + ['+Inf'], histogram['bucket_counts']):
+                cumulative_count += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{upper_bound}"}} {cumulative_count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+phase_histograms = PhaseHistograms(duration_buckets)
+# sizes of the callback responses as serialized to JSON ('serialized') and as sent after compression ('sent')
+response_size_histograms = PhaseHistograms(size_buckets,
+                                           label='stage',
+                                           description='Size of the responses of the dashboard callbacks in bytes.')
+
+
+# calls made outside of the requests, like the cache warm-up, are not recorded in the histograms
+_recording = threading.local()
+
+
+# context manager under which the phases timed by the current thread are not recorded
+@contextmanager
+def not_recorded():
+    _recording.disabled = True
+    try:
+        yield
+    finally:
+        _recording.disabled = False
+
+
+# decorator that calls the function without recording the phases it times
+def without_recording(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with not_recorded():
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+# define a function that records the duration of a phase in the histograms and, inside a request,
+# in the list of timings sent back in the Server-Timing header
+def record_phase(callback_name, phase, duration):
+    if getattr(_recording, 'disabled', False):
+        return
+    phase_histograms.observe(callback_name, phase, duration)
+    if has_request_context():
+        g.setdefault('server_timings', []).append((f'{callback_name}.{phase}', duration))
+
+
+# context manager that measures the duration of a phase of a callback
+@contextmanager
+def timed(callback_name, phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(callback_name, phase, time.perf_counter() - start)
+
+
+# decorator that measures the whole callback and the JSON serialization of its result, which Dash does
+# after the callback returns and which is measured up to the end of the request
+def instrumented_callback(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with timed(function.__name__, 'total'):
+            result = function(*args, **kwargs)
+        if has_request_context():
+            g.callback_finished = (function.__name__, time.perf_counter())
+        return result
+
+    return wrapper
+
+
+# define a function that returns hit and miss counters of the caches in the Prometheus text exposition format;
+# the counters of other processes, as {cache_name: {'hits': ..., 'misses': ...}}, are added if they are given
+def caches_to_prometheus(caches, other_counters=()):
+    lines = []
+    for counter in ('hits', 'misses'):
+        name = f'games_dashboard_cache_{counter}_total'
+        lines += [f'# HELP {name} Number of cache {counter}.', f'# TYPE {name} counter']
+        for cache_name, cache in caches.items():
+            value = getattr(cache, counter) + sum(counters.get(cache_name, {}).get(counter, 0)
+                                                  for counters in other_counters)
+            lines.append(f'{name}{{cache="{cache_name}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# define a function that returns gauges, given as (name, description, value) by process, in the Prometheus
+# text exposition format; with several processes every value gets the pid of its process as worker label
+def gauges_to_prometheus(gauges_by_process):
+    descriptions = {}
+    values = {}
+    for pid, gauges in gauges_by_process.items():
+        for name, description, value in gauges:
+            descriptions[name] = description
+            values.setdefault(name, []).append((pid, value))
+    lines = []
+    for name, description in descriptions.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+        for pid, value in values[name]:
+            lines.append(f'{name}{{worker="{pid}"}} {value}' if len(gauges_by_process) > 1 else f'{name} {value}')
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+# metrics of the worker processes in a shared directory, one JSON file per process named after its pid.
+# A process writes its own file from a background thread at most every interval seconds, and reads
+# the files of the other processes when it answers a scrape. The files of exited workers are kept,
+# so the counters and histograms never go down when a worker is replaced, only their gauges are removed
+class MetricsSnapshots:
+    def __init__(self, directory, get_snapshot, interval=1.0):
+        self.directory = directory
+        self.get_snapshot = get_snapshot
+        self.interval = interval
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'{pid}.json')
+
+    # start the writer thread once per process; threads don't survive a fork, so every worker starts its own
+    def start(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            threading.Thread(target=self._run, name='games-metrics-writer', daemon=True).start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.write()
+
+    @staticmethod
+    def _write_file(path, snapshot):
+        # write to a temporary file first, so that the other processes never read a partially written file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file)
+        os.replace(temporary_path, path)
+
+    def write(self):
+        self._write_file(self._path(os.getpid()), self.get_snapshot())
+
+    # return the snapshots of the other processes; a file that can't be read is skipped
+    def read_others(self):
+        snapshots = []
+        for file_name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            if not file_name.endswith('.json') or file_name == f'{os.getpid()}.json':
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), encoding='utf-8') as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # remove the gauges of an exited worker, called by the master process (gunicorn's child_exit hook)
+    def mark_process_dead(self, pid):
+        try:
+            with open(self._path(pid), encoding='utf-8') as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return
+        snapshot['gauges'] = []
+        self._write_file(self._path(pid), snapshot)
+
+    # remove the files of a previous run, called once before the workers start (gunicorn's on_starting hook)
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.json'):
+                os.remove(os.path.join(self.directory, file_name))
+
+
+# define a function that sends the INFO logs of the dashboard modules to the given handlers, by default
+# to stderr with the pid of the process; GAMES_LOG_LEVEL changes the level. Under gunicorn the handlers
+# of its error log are given (see gunicorn.conf.py), so the reports appear in the server log
+def init_logging(handlers=None):
+    if handlers is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('[%(asctime)s] [%(process)d] [%(levelname)s] %(name)s: %(message)s'))
+        handlers = [handler]
+    for module_name in logged_modules:
+        module_logger = logging.getLogger(module_name)
+        module_logger.setLevel(os.environ.get('GAMES_LOG_LEVEL', 'INFO'))
+        module_logger.handlers = list(handlers)
+        module_logger.propagate = False
+
+
+# define a function that records the size of the callback responses as sent, after compression;
+# Flask runs the after_request functions in the reverse order of their registration, so this function
+# is called before the compression is initialized and init_instrumentation() after it
+def init_sent_size_metrics(server):
+    @server.after_request
+    def record_sent_size(response):
+        callback_name = g.pop('response_callback', None)
+        if callback_name is not None and response.content_length is not None:
+            response_size_histograms.observe(callback_name, 'sent', response.content_length)
+        return response
+
+
+# define a function that returns the MetricsSnapshots of the process if PROMETHEUS_MULTIPROC_DIR is set,
+# with the histograms, the counters of the given caches and the values of the given gauge functions
+def get_metrics_snapshots(caches=None, gauge_functions=None):
+    if not multiprocess_directory:
+        return None
+    return MetricsSnapshots(multiprocess_directory,
+                            lambda: {'pid': os.getpid(),
+                                     'phases': phase_histograms.snapshot(),
+                                     'response_sizes': response_size_histograms.snapshot(),
+                                     'caches': {cache_name: {'hits': cache.hits, 'misses': cache.misses}
+                                                for cache_name, cache in (caches or {}).items()},
+                                     'gauges': [gauge for get_gauges in gauge_functions or []
+                                                for gauge in get_gauges()]},
+                            snapshot_interval)
+
+
+# define a function that adds the Server-Timing header and the /metrics endpoint to the Flask server;
+# the hit and miss counters of the given caches and the gauges, as (name, description, value), returned
+# by the given gauge functions are exposed too. Returns the MetricsSnapshots that sums the metrics
+# over the worker processes, None without PROMETHEUS_MULTIPROC_DIR
+def init_instrumentation(server, caches=None, gauge_functions=None):
+    metrics_snapshots = get_metrics_snapshots(caches, gauge_functions)
+    if metrics_snapshots is not None:
+        server.before_request(metrics_snapshots.start)
+
+    @server.after_request
+    def add_server_timing(response):
+        callback_finished = g.pop('callback_finished', None)
+        if callback_finished is not None:
+            callback_name, finished = callback_finished
+            record_phase(callback_name, 'serialize', time.perf_counter() - finished)
+            if response.content_length is not None:
+                response_size_histograms.observe(callback_name, 'serialized', response.content_length)
+                g.response_callback = callback_name
+        server_timings = g.pop('server_timings', None)
+        if server_timings:
+            response.headers['Server-Timing'] = ', '.join(f'{name};dur={duration * 1000:.2f}'
+                                                          for name, duration in server_timings)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        other_snapshots = metrics_snapshots.read_others() if metrics_snapshots is not None else []
+        gauges_by_process = {os.getpid(): [gauge for get_gauges in gauge_functions or [] for gauge in get_gauges()]}
+        gauges_by_process.update((snapshot['pid'], snapshot['gauges']) for snapshot in other_snapshots
+                                 if snapshot['gauges'])
+        return Response(phase_histograms.to_prometheus(other_snapshots=[snapshot['phases']
+                                                                        for snapshot in other_snapshots])
+                        + response_size_histograms.to_prometheus('games_dashboard_response_size_bytes',
+                                                                 [snapshot['response_sizes']
+                                                                  for snapshot in other_snapshots])
+                        + caches_to_prometheus(caches or {}, [snapshot['caches'] for snapshot in other_snapshots])
+                        + gauges_to_prometheus(gauges_by_process),
+                        mimetype='text/plain; version=0.0.4')
+
+    return metrics_snapshots
@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+
+# bring a filter selection to one canonical form, so that equivalent selections share a cache entry:
+# lists are sorted, None and empty lists mean "all", missing years are replaced by the defaults
+# and years given as strings or numbers are converted to int
+def normalize_selection(selected_platforms, selected_genres, selected_start_year, selected_end_year):
+    def normalize_values(selected_values):
+        if not selected_values:
+            return None
+        if isinstance(selected_values, str):
+            selected_values = [selected_values]
+        return tuple(sorted(set(selected_values)))
+
+    return (normalize_values(selected_platforms),
+            normalize_values(selected_genres),
+            int(selected_start_year or 2000),
+            int(selected_end_year or 2022))
+
+
+# in-process cache with a size bound and least recently used eviction
+class LRUCache:
+    shared = False
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+# cache stored as pickle files in a directory, so that several worker processes share it;
+# the least recently used files are removed when the size bound is exceeded, and files not used
+# for max_age seconds are removed, like the entries of an old data version that no key matches anymore.
+# The directory is not scanned on every set: the entries counted by the last scan plus the new entries written
+# by this process are tracked in memory, and the directory is scanned again only when that number passes
+# maxsize or, with max_age, every tenth of max_age. A scan removes entries down to nine tenths of maxsize,
+# so the cost of the scans is spread over the following sets; entries written by other workers in the meantime
+# are only counted by the next scan, so the directory can briefly hold more than maxsize entries
+class FileCache:
+    shared = True
+
+    def __init__(self, directory, maxsize=1024, max_age=None):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = len(self._entries())
+        self._next_scan = self._get_next_scan()
+
+    def _get_next_scan(self):
+        return time.time() + self.max_age / 10 if self.max_age is not None else float('inf')
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+            # mark the entry as recently used
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        new_entry = not os.path.exists(path)
+        # write to a temporary file first, so that other workers never read a partially written entry
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self._size += new_entry
+        if self._size > self.maxsize or time.time() >= self._next_scan:
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        entries.sort()
+        evicted_number = len(entries) - self.maxsize * 9 // 10 if len(entries) > self.maxsize else 0
+        if self.max_age is not None:
+            oldest_used = time.time() - self.max_age
+            evicted_number = max(evicted_number, sum(used < oldest_used for used, _ in entries))
+        for _, path in entries[:evicted_number]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = len(entries) - evicted_number
+        self._next_scan = self._get_next_scan()
+
+    def clear(self):
+        for _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries()), 'maxsize': self.maxsize}
+
+
+# create the cache for rendered results: a directory shared by all workers if GAMES_CACHE_DIR is set,
+# whose entries are removed GAMES_CACHE_MAX_AGE seconds after their last use (an hour by default),
+# otherwise an in-process cache
+def make_cache(maxsize):
+    cache_directory = os.environ.get('GAMES_CACHE_DIR')
+    if cache_directory:
+        return FileCache(cache_directory, maxsize, max_age=float(os.environ.get('GAMES_CACHE_MAX_AGE', 3600)))
+    return LRUCache(maxsize)
+
+
+# memoize a function of a filter selection in the given cache under the normalized selection;
+# if version is given, it returns the version of the data and is part of the key, so that results
+# computed from an older version of the data are never returned
+def cached_by_selection(cache, version=None):
+    def decorator(function):
+        missing = object()
+
+        @wraps(function)
+        def wrapper(selected_platforms, selected_genres, selected_start_year, selected_end_year):
+            key = (function.__name__,) + normalize_selection(selected_platforms,
+                                                             selected_genres,
+                                                             selected_start_year,
+                                                             selected_end_year)
+            if version is not None:
+                key += (version(),)
+            value = cache.get(key, missing)
+            if value is missing:
+                value = function(selected_platforms, selected_genres, selected_start_year, selected_end_year)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
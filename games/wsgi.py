@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import threading
+
+# the dashboard modules and games.csv are found relative to this directory, whatever the working directory is
+games_directory = os.path.dirname(os.path.abspath(__file__))
+if games_directory not in sys.path:
+    sys.path.insert(0, games_directory)
+os.environ.setdefault('GAMES_CSV', os.path.join(games_directory, 'games.csv'))
+
+
+# WSGI middleware that lets the first request of a process through alone: Dash registers the callbacks
+# in a hook of its first request, which marks the registration as done when it starts, so a concurrent
+# request of a threaded worker could be dispatched before the callbacks are registered
+class FirstRequestLock:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._lock = threading.Lock()
+        self._first_request_done = False
+
+    def __call__(self, environ, start_response):
+        if not self._first_request_done:
+            with self._lock:
+                if not self._first_request_done:
+                    try:
+                        return self.wsgi_app(environ, start_response)
+                    finally:
+                        self._first_request_done = True
+        return self.wsgi_app(environ, start_response)
+
+
+# define a function that returns the WSGI application of the dashboard; the dataset is loaded,
+# indexed and aggregated on the first call, so a server that calls it before forking its workers
+# (gunicorn with preload_app, see gunicorn.conf.py) shares these read-only pages between all workers
+def create_app():
+    import games_market_dash_Evgeniia_Galiaukh as dashboard
+
+    server = dashboard.app.server
+    if not isinstance(server.wsgi_app, FirstRequestLock):
+        server.wsgi_app = FirstRequestLock(server.wsgi_app)
+    return server
+
+
+# define a function that serves the dashboard with waitress, a multi-threaded production server
+# that also runs on Windows, where gunicorn is not available
+def serve_waitress(host, port, threads):
+    from waitress import serve
+
+    serve(create_app(), host=host, port=port, threads=threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Production server of the games dashboard, '
+                                                 'use "gunicorn -c gunicorn.conf.py" for several processes')
+    parser.add_argument('--host', default=os.environ.get('GAMES_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('GAMES_PORT', 8050)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('GAMES_THREADS', 8)))
+    args = parser.parse_args()
+    serve_waitress(args.host, args.port, args.threads)
+
+
+if __name__ == '__main__':
+    main()
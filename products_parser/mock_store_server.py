@@ -0,0 +1,60 @@
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+from urllib.parse import parse_qs, urlparse
+
+# local stand-in of the products endpoint of fakestoreapi.com with a catalogue of any size, to run
+# the ingestion without the real API: the products have the fields of the real ones and are read
+# in pages with ?limit=<page size>&offset=<offset>
+categories = ["men's clothing", "jewelery", "electronics", "women's clothing"]
+
+
+# define a function that returns the product with an id, the same on every request
+def get_product(product_id):
+    generator = random.Random(product_id)
+    return {'id': product_id,
+            'title': f'Mock product {product_id}',
+            'price': round(generator.lognormvariate(3.5, 1.0), 2),
+            'description': f'Description of the mock product {product_id}',
+            'category': categories[product_id % len(categories)],
+            'image': f'https://fakestoreapi.com/img/{product_id}.jpg',
+            'rating': {'rate': round(generator.uniform(1, 5), 1), 'count': generator.randint(0, 1000)}}
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    products = 20
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/products':
+            self.send_error(404)
+            return
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', self.products))
+        body = json.dumps([get_product(product_id)
+                           for product_id in range(offset + 1, min(offset + limit, self.products) + 1)]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock store API, the ingestion uses it with '
+                                                 '--url http://127.0.0.1:<port>/products')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--products', type=int, default=1_000_000, help='number of products of the catalogue')
+    args = parser.parse_args()
+
+    StoreHandler.products = args.products
+    ThreadingHTTPServer(('127.0.0.1', args.port), StoreHandler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+products_url = "https://fakestoreapi.com/products"
+# percentiles of the price that split the products, as in the notebook: cheap up to the 30th percentile,
+# middle between the 40th and the 70th, expensive from the 70th
+price_percentiles = [30, 40, 70]
+# the largest number of rows of an Excel sheet, bigger segments are written as Parquet files
+excel_max_rows = 1048575
+
+
+# flattener of nested products into rows, with the same column names as get_leaves(): the keys of nested
+# dictionaries joined by spaces. The items are walked with a stack instead of recursion, and the column
+# names are built once for every shape of item, the walk only collects the keys and the values.
+# Different keys can give the same column name, like {'a': {'b': 1}} and {'a b': 1}, which raises a ValueError
+# instead of mixing their values in one column
+class LeafFlattener:
+    def __init__(self):
+        self._columns_by_shape = {}
+        # keys of the leaf of every column name of the shapes seen so far
+        self._keys_by_column = {}
+
+    # return the shape of an item, the keys in the order of the walk with markers of nested dictionaries,
+    # and its leaf values in the same order
+    @staticmethod
+    def _walk(item):
+        shape = []
+        values = []
+        stack = [iter(item.items())]
+        while stack:
+            for key, value in stack[-1]:
+                if isinstance(value, dict):
+                    shape.append((key,))
+                    stack.append(iter(value.items()))
+                    break
+                shape.append(key)
+                values.append(value)
+            else:
+                stack.pop()
+                shape.append(None)
+        return tuple(shape), values
+
+    # return the keys of the leaves of a shape, every key prefixed by the keys of its parents
+    @staticmethod
+    def _shape_keys(shape):
+        leaf_keys = []
+        prefixes = []
+        for key in shape:
+            if key is None:
+                if prefixes:
+                    prefixes.pop()
+            elif isinstance(key, tuple):
+                prefixes.append(key[0])
+            else:
+                leaf_keys.append(tuple(prefixes) + (key,))
+        return leaf_keys
+
+    # return the column names of a shape, checking that no other keys gave the same names
+    def _shape_columns(self, shape):
+        columns = []
+        for keys in self._shape_keys(shape):
+            column = ' '.join(str(key) for key in keys)
+            known_keys = self._keys_by_column.setdefault(column, keys)
+            if known_keys != keys:
+                raise ValueError(f'the keys {list(known_keys)} and {list(keys)} both give the column {column!r}')
+            columns.append(column)
+        return columns
+
+    # return the columns and the leaf values of an item
+    def flatten(self, item):
+        if not isinstance(item, dict):
+            return [''], [item]
+        shape, values = self._walk(item)
+        columns = self._columns_by_shape.get(shape)
+        if columns is None:
+            columns = self._columns_by_shape[shape] = self._shape_columns(shape)
+        return columns, values
+
+    def get_leaves(self, item):
+        return dict(zip(*self.flatten(item)))
+
+
+# reservoir sample of the prices that gives their percentiles after one pass: the percentiles are exact
+# while there are at most sample_size prices, approximated from a uniform sample of them beyond
+class PriceSample:
+    def __init__(self, sample_size=1_000_000, seed=0):
+        self.sample_size = sample_size
+        self.count = 0
+        self._sample = np.empty(sample_size, dtype=np.float64)
+        self._random = np.random.default_rng(seed)
+
+    def add(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        prices = prices[~np.isnan(prices)]
+        free = min(max(self.sample_size - self.count, 0), len(prices))
+        self._sample[self.count:self.count + free] = prices[:free]
+        # every further price replaces a random entry with probability sample_size / count, as in algorithm R
+        positions = self.count + free + np.arange(len(prices) - free)
+        replaced = self._random.integers(0, positions + 1) if len(positions) else positions
+        kept = replaced < self.sample_size
+        self._sample[replaced[kept]] = prices[free:][kept]
+        self.count += len(prices)
+
+    @property
+    def exact(self):
+        return self.count <= self.sample_size
+
+    def percentiles(self, percentiles):
+        return np.percentile(self._sample[:min(self.count, self.sample_size)], percentiles)
+
+
+# define a function that returns a requests session with a pool of connections for the concurrent requests
+# and retries of failed requests
+def get_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# define a function that yields the pages of products in order; up to concurrency pages are requested at once
+# with ?limit=<page_size>&offset=<offset>, the pages after the first page shorter than page_size are dropped.
+# An API without offsets, like fakestoreapi.com, is read in one page if page_size is not smaller than the catalogue;
+# with a smaller page_size it returns the same page again, which raises a ValueError instead of repeating the rows
+def get_product_pages(url, page_size=1000, concurrency=8, session=None, timeout=30):
+    session = session or get_session(concurrency)
+
+    def get_page(page):
+        response = session.get(url, params={'limit': page_size, 'offset': page * page_size}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {page: executor.submit(get_page, page) for page in range(concurrency)}
+        next_page = concurrency
+        page = 0
+        previous_products = None
+        while True:
+            products = pending.pop(page).result()
+            if products and products == previous_products:
+                raise ValueError(f'{url} returned the same products for offsets {(page - 1) * page_size} '
+                                 f'and {page * page_size}, it ignores the offset parameter; '
+                                 f'use a page size not smaller than the catalogue')
+            previous_products = products
+            yield products
+            if len(products) < page_size:
+                break
+            pending[next_page] = executor.submit(get_page, next_page)
+            next_page += 1
+            page += 1
+        for future in pending.values():
+            future.cancel()
+
+
+# writer of flattened rows to a Parquet file in batches of batch_size rows, so that the products are never
+# all in memory. The values are appended to a list per column; rows of the same shape share their list
+# of column names, whose positions are looked up once. The columns are those of the first batch, in the order
+# of get_leaves(), and their types are kept for the following batches: a later batch with a new column or
+# a value of another type raises a ValueError, only integers are widened to a floating point column and
+# missing values are allowed in any column; on_batch is called with every batch
+class ParquetRowWriter:
+    def __init__(self, path, batch_size=100_000, on_batch=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.rows = 0
+        self._columns = []
+        self._column_values = []
+        self._batch_rows = 0
+        self._positions_by_columns = {}
+        self._writer = None
+
+    # return the positions of the row columns in the written columns and the positions of the missing columns
+    def _positions(self, columns):
+        key = id(columns)
+        if key in self._positions_by_columns and self._positions_by_columns[key][0] is columns:
+            return self._positions_by_columns[key][1:]
+        for column in columns:
+            if column not in self._columns:
+                if self._writer is not None:
+                    raise ValueError(f'column {column!r} appeared after the first batch of {self.path}, '
+                                     f'a larger batch_size includes it in the schema')
+                self._columns.append(column)
+                self._column_values.append([None] * self._batch_rows)
+                # the positions of the other shapes miss the new column
+                self._positions_by_columns.clear()
+        positions = [self._columns.index(column) for column in columns]
+        missing_positions = sorted(set(range(len(self._columns))) - set(positions))
+        self._positions_by_columns[key] = (columns, positions, missing_positions)
+        return positions, missing_positions
+
+    def write(self, columns, values):
+        positions, missing_positions = self._positions(columns)
+        for position, value in zip(positions, values):
+            self._column_values[position].append(value)
+        for position in missing_positions:
+            self._column_values[position].append(None)
+        self._batch_rows += 1
+        if self._batch_rows >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch_rows:
+            return
+        table = self._to_table()
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        if self.on_batch is not None:
+            self.on_batch(table)
+        self.rows += self._batch_rows
+        self._column_values = [[] for _ in self._columns]
+        self._batch_rows = 0
+
+    # return the table of the batch, with the types of the first batch for the following ones
+    def _to_table(self):
+        arrays = []
+        for position, (column, values) in enumerate(zip(self._columns, self._column_values)):
+            try:
+                array = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as error:
+                raise ValueError(f'column {column!r} of {self.path} mixes values of different types: '
+                                 f'{error}') from error
+            if self._writer is not None:
+                field_type = self._writer.schema.field(position).type
+                if array.type != field_type:
+                    if not (pa.types.is_null(array.type)
+                            or pa.types.is_integer(array.type) and pa.types.is_floating(field_type)):
+                        raise ValueError(f'column {column!r} of {self.path} has values of type {array.type}, '
+                                         f'the first batch had {field_type}; a larger batch_size includes '
+                                         f'both in the schema')
+                    array = array.cast(field_type)
+            arrays.append(array)
+        if self._writer is not None:
+            return pa.Table.from_arrays(arrays, schema=self._writer.schema)
+        return pa.Table.from_arrays(arrays, names=self._columns)
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+# define a function that streams the products of the API into a Parquet file and returns the number of products
+# and the sample of their prices; the items are flattened as they arrive
+def ingest_products(url, output_path, page_size=1000, concurrency=8, batch_size=100_000, sample_size=1_000_000):
+    flattener = LeafFlattener()
+    price_sample = PriceSample(sample_size)
+    writer = ParquetRowWriter(output_path, batch_size,
+                              on_batch=lambda table: price_sample.add(
+                                  table.column('price').to_numpy(zero_copy_only=False)))
+    try:
+        for products in get_product_pages(url, page_size, concurrency):
+            for product in products:
+                writer.write(*flattener.flatten(product))
+    finally:
+        writer.close()
+    return writer.rows, price_sample
+
+
+# define a function that splits the products of the Parquet file into cheap, middle and expensive products
+# at the percentiles of the price, in one pass over the row groups of the file; the segments are written
+# to Excel files as in the notebook, or to Parquet files if they don't fit in an Excel sheet
+def split_by_price(parquet_path, price_sample, output_directory='.', output_format='xlsx'):
+    cheap_price, middle_start_price, expensive_price = price_sample.percentiles(price_percentiles).tolist()
+    segments = {'cheap': lambda prices: prices <= cheap_price,
+                'middle': lambda prices: (middle_start_price <= prices) & (prices <= expensive_price),
+                'expensive': lambda prices: prices >= expensive_price}
+    if output_format == 'xlsx' and price_sample.count > excel_max_rows:
+        output_format = 'parquet'
+
+    parquet_file = pq.ParquetFile(parquet_path)
+    parts = {segment: [] for segment in segments}
+    writers = {}
+    for row_group in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(row_group)
+        prices = table.column('price').to_numpy(zero_copy_only=False)
+        for segment, select in segments.items():
+            segment_table = table.filter(pa.array(select(prices)))
+            if output_format == 'xlsx':
+                parts[segment].append(segment_table)
+                continue
+            if segment not in writers:
+                writers[segment] = pq.ParquetWriter(os.path.join(output_directory, f'{segment}.parquet'),
+                                                    table.schema)
+            writers[segment].write_table(segment_table)
+    for writer in writers.values():
+        writer.close()
+
+    if output_format == 'xlsx':
+        for segment, tables in parts.items():
+            df = pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame()
+            df.to_excel(os.path.join(output_directory, f'{segment}.xlsx'))
+    return {'cheap': cheap_price, 'middle': (middle_start_price, expensive_price), 'expensive': expensive_price,
+            'exact': price_sample.exact, 'format': output_format}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load the products of the store API into a Parquet file '
+                                                 'and split them by price into cheap, middle and expensive products')
+    parser.add_argument('--url', default=products_url)
+    parser.add_argument('--output', default='products.parquet')
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=100_000, help='rows per Parquet row group')
+    parser.add_argument('--sample-size', type=int, default=1_000_000,
+                        help='prices kept for the percentiles, which are approximate for more products')
+    parser.add_argument('--split-format', choices=['xlsx', 'parquet'], default='xlsx')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows, price_sample = ingest_products(args.url, args.output, args.page_size, args.concurrency,
+                                         args.batch_size, args.sample_size)
+    ingested = time.perf_counter()
+    split = split_by_price(args.output, price_sample, os.path.dirname(os.path.abspath(args.output)),
+                           args.split_format)
+    print(f'{rows} products written to {args.output} in {ingested - started:.1f} s, '
+          f'split in {time.perf_counter() - ingested:.1f} s: {split}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+
+# columns of the index of the extract: the rows of every (indicator_name, object_name) series are contiguous
+# in the cached file, which is sorted by these columns and by year
+index_columns = ['indicator_name', 'object_name', 'year']
+# columns stored dictionary-encoded, read back as pandas categoricals: their long names repeat on every row
+dictionary_columns = ['indicator_name', 'object_name']
+# rows of a row group of the cached file; the smallest unit that is read, so a series reads at most
+# two row groups more than its own rows
+row_group_rows = 16384
+index_metadata_key = b'statistics_extract_index'
+
+
+# define a function that returns the hash of a file, read in blocks
+def get_file_hash(path):
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+# define a function that returns the path of the cached copy of a CSV extract; the name contains the hash
+# of the CSV, so a changed extract never matches an old copy
+def get_cache_path(csv_path, cache_directory=None):
+    if cache_directory is None:
+        cache_directory = os.path.join(os.path.dirname(csv_path) or '.', '.cache')
+    csv_name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_directory, f'{csv_name}-{get_file_hash(csv_path)[:16]}.parquet')
+
+
+# define a function that returns the first and the end row of every (indicator_name, object_name) series
+# of a table sorted by them, with the years of the series
+def build_index(table):
+    names = table.select(['indicator_name', 'object_name']).to_pandas()
+    indicator_codes, _ = pd.factorize(names['indicator_name'])
+    object_codes, _ = pd.factorize(names['object_name'])
+    years = table.column('year').to_numpy()
+    starts = np.flatnonzero(np.r_[True, (indicator_codes[1:] != indicator_codes[:-1])
+                                  | (object_codes[1:] != object_codes[:-1])])
+    ends = np.r_[starts[1:], len(years)]
+    return [[names['indicator_name'].iat[start], names['object_name'].iat[start], int(start), int(end),
+             int(years[start]), int(years[end - 1])]
+            for start, end in zip(starts, ends)]
+
+
+# define a function that converts a CSV extract into the cached Parquet file: sorted by indicator_name,
+# object_name and year, with dictionary-encoded names, small row groups with statistics for the pushdown
+# of predicates, and the index of the series in the file metadata
+def convert_extract(csv_path, cache_path, sep=';', encoding='utf-8'):
+    table = pa_csv.read_csv(csv_path,
+                            read_options=pa_csv.ReadOptions(encoding=encoding),
+                            parse_options=pa_csv.ParseOptions(delimiter=sep))
+    table = table.sort_by([(column, 'ascending') for column in index_columns])
+    index = build_index(table)
+    for column in dictionary_columns:
+        table = table.set_column(table.schema.get_field_index(column), column,
+                                 pc.dictionary_encode(table.column(column)))
+    table = table.replace_schema_metadata({index_metadata_key: json.dumps(index, ensure_ascii=False)})
+
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    # write to a temporary file first, so that a reader never opens a partially written copy
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or '.', suffix='.tmp')
+    os.close(file_descriptor)
+    try:
+        pq.write_table(table, temporary_path, row_group_size=row_group_rows, write_statistics=True)
+        os.replace(temporary_path, cache_path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+# statistics extract in its cached form: a series of an indicator for an object is read through the index,
+# only the row groups holding its rows; other selections push their predicates down into the read,
+# which skips the row groups whose statistics don't match
+class StatisticsExtract:
+    def __init__(self, parquet_path):
+        self.path = parquet_path
+        self.file = pq.ParquetFile(parquet_path, read_dictionary=dictionary_columns)
+        metadata = self.file.schema_arrow.metadata or {}
+        self.index = {(indicator_name, object_name): (start, end, first_year, last_year)
+                      for indicator_name, object_name, start, end, first_year, last_year
+                      in json.loads(metadata[index_metadata_key])}
+        self._row_group_starts = np.cumsum([0] + [self.file.metadata.row_group(row_group).num_rows
+                                                  for row_group in range(self.file.num_row_groups)])
+
+    # open the cached copy of a CSV extract, converting the CSV first if there is no up to date copy
+    @classmethod
+    def from_csv(cls, csv_path, cache_directory=None, sep=';', encoding='utf-8'):
+        cache_path = get_cache_path(csv_path, cache_directory)
+        if not os.path.exists(cache_path):
+            convert_extract(csv_path, cache_path, sep, encoding)
+        return cls(cache_path)
+
+    def indicators(self):
+        return sorted({indicator_name for indicator_name, _ in self.index})
+
+    def objects(self, indicator_name=None):
+        return sorted({object_name for name, object_name in self.index
+                       if indicator_name is None or name == indicator_name})
+
+    # return the rows of a series, optionally limited to a range of years and without some years,
+    # as in the notebook: series(tour_rus, start_year=2002, exclude_years=[2003])
+    def series(self, indicator_name, object_name='Российская Федерация', start_year=None, end_year=None,
+               exclude_years=(), columns=('indicator_name', 'year', 'indicator_value')):
+        columns = list(columns)
+        if (indicator_name, object_name) not in self.index:
+            return self.file.schema_arrow.empty_table().select(columns).to_pandas()
+        start, end, _, _ = self.index[(indicator_name, object_name)]
+        first_row_group = int(np.searchsorted(self._row_group_starts, start, side='right')) - 1
+        last_row_group = int(np.searchsorted(self._row_group_starts, end, side='left')) - 1
+        row_groups = list(range(first_row_group, last_row_group + 1))
+        table = self.file.read_row_groups(row_groups, columns=sorted(set(columns) | {'year'}))
+        table = table.slice(start - self._row_group_starts[first_row_group], end - start)
+
+        years = table.column('year')
+        mask = pc.invert(pc.is_in(years, value_set=pa.array(list(exclude_years), type=years.type)))
+        if start_year is not None:
+            mask = pc.and_(mask, pc.greater_equal(years, start_year))
+        if end_year is not None:
+            mask = pc.and_(mask, pc.less_equal(years, end_year))
+        return table.filter(mask).select(columns).to_pandas()
+
+    # return the rows matching the filters, in the DNF form of pyarrow.parquet.read_table(), e.g.
+    # [('object_name', '==', 'Российская Федерация'), ('year', '>', 2001)]; only the matching row groups are read
+    def read(self, filters=None, columns=None):
+        return pq.read_table(self.path, columns=columns, filters=filters,
+                             read_dictionary=dictionary_columns).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a statistics extract (CSV separated by ";") '
+                                                 'into its cached indexed form')
+    parser.add_argument('csv', nargs='?', default='section_6.csv')
+    parser.add_argument('--cache-directory')
+    args = parser.parse_args()
+
+    extract = StatisticsExtract.from_csv(args.csv, args.cache_directory)
+    print(f'{extract.file.metadata.num_rows} rows, {len(extract.indicators())} indicators, '
+          f'{len(extract.index)} series cached in {extract.path}')
+
+
+if __name__ == '__main__':
+    main()
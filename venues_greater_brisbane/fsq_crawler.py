@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import time
+
+import aiohttp
+
+try:
+    from geopy.distance import geodesic
+except ImportError:
+    geodesic = None
+
+
+places_search_url = 'https://api.foursquare.com/v3/places/search'
+search_category = 17000
+# the grid points are 6 km apart, half of the diagonal of a grid square covers the space between the points
+search_radius = 4243
+# the largest page of the Places API, fewer pages mean fewer requests
+search_limit = 50
+
+# columns of the exported venues, as in the schema of the BigQuery table
+venue_columns = ['fsq_id', 'point_id', 'latitude', 'longitude', 'address', 'country', 'cross_street',
+                 'formatted_address', 'locality', 'postcode', 'region', 'name', 'dist']
+location_columns = ['address', 'country', 'cross_street', 'formatted_address', 'locality', 'postcode', 'region']
+
+# status codes after which a request is sent again, with a growing pause
+retry_statuses = {429, 500, 502, 503, 504}
+
+
+# define a function that returns the distance between two points in km: geodesic if geopy is installed,
+# otherwise on a sphere, which differs by less than 0.5%
+def get_distance(latitude, longitude, other_latitude, other_longitude):
+    if geodesic is not None:
+        return geodesic((latitude, longitude), (other_latitude, other_longitude)).km
+    latitude, longitude, other_latitude, other_longitude = map(math.radians, (latitude, longitude,
+                                                                              other_latitude, other_longitude))
+    haversine = (math.sin((other_latitude - latitude) / 2) ** 2
+                 + math.cos(latitude) * math.cos(other_latitude) * math.sin((other_longitude - longitude) / 2) ** 2)
+    return 2 * 6371.0088 * math.asin(math.sqrt(haversine))
+
+
+# define a function that reads the grid points as (point_id, latitude, longitude) from a GeoJSON file
+# of Point features with an 'id' property, or from a CSV file with point_id, latitude and longitude columns
+def read_grid_points(path):
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as file:
+            return [(row['point_id'], float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(file)]
+    with open(path, encoding='utf-8') as file:
+        features = json.load(file)['features']
+    return [(str(feature['properties']['id']), feature['geometry']['coordinates'][1],
+             feature['geometry']['coordinates'][0]) for feature in features]
+
+
+# define a function that returns the row of a venue found from a grid point, None if the venue has no location
+def get_venue_row(point, venue):
+    point_id, latitude, longitude = point
+    try:
+        venue_latitude = venue['geocodes']['main']['latitude']
+        venue_longitude = venue['geocodes']['main']['longitude']
+    except (KeyError, TypeError):
+        return None
+    location = venue.get('location', {})
+    row = {'fsq_id': venue['fsq_id'], 'point_id': str(point_id),
+           'latitude': venue_latitude, 'longitude': venue_longitude}
+    row.update({column: location.get(column) for column in location_columns})
+    row['name'] = venue.get('name')
+    row['dist'] = get_distance(latitude, longitude, venue_latitude, venue_longitude)
+    return row
+
+
+# limiter of the request rate shared by all concurrent requests: the requests are started at most
+# rate times per second, evenly spaced
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# venues by fsq_id, keeping the row found from the nearest grid point, as the ROW_NUMBER() query
+# partitioned by fsq_id and ordered by dist did after the upload
+class VenueDeduplicator:
+    def __init__(self):
+        self.venues = {}
+
+    # add the row and return True if it is a new venue or nearer than the kept row of the venue
+    def add(self, row):
+        kept_row = self.venues.get(row['fsq_id'])
+        if kept_row is not None and kept_row['dist'] <= row['dist']:
+            return False
+        self.venues[row['fsq_id']] = row
+        return True
+
+    def rows(self):
+        return sorted(self.venues.values(), key=lambda row: row['fsq_id'])
+
+
+# progress of a crawl as a JSON Lines file: one line per finished grid point with the rows that changed
+# the deduplicated venues, appended as soon as the point is finished. An interrupted crawl reads it back,
+# which restores the venues and skips the finished points
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.finished_points = set()
+
+    # read the finished points and add their rows to the deduplicator; a line cut by the interruption
+    # and everything after it is truncated, so that the next lines are appended after the last valid one
+    def restore(self, deduplicator):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        valid_size = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('line cut by the interruption')
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                valid_size += len(line)
+                self.finished_points.add(entry['point_id'])
+                for row in entry['rows']:
+                    deduplicator.add(row)
+        if valid_size < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as file:
+                file.truncate(valid_size)
+
+    def save(self, point_id, rows):
+        self.finished_points.add(point_id)
+        if self.path is None:
+            return
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'point_id': point_id, 'rows': rows}) + '\n')
+
+
+# crawler of the venues of a category around every grid point: the points are fetched concurrently by
+# a pool of tasks sharing one HTTP session and one rate limiter, the pages of a point are followed
+# one after another through the Link rel="next" header
+class GridCrawler:
+    def __init__(self, api_key, url=places_search_url, category=search_category, radius=search_radius,
+                 limit=search_limit, concurrency=16, requests_per_second=40, retries=5, timeout=30):
+        self.api_key = api_key
+        self.url = url
+        self.category = category
+        self.radius = radius
+        self.limit = limit
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.retries = retries
+        self.timeout = timeout
+        self.requests = 0
+
+    # send a request, again after a pause if it failed with a status that may pass later
+    async def _get_page(self, session, rate_limiter, url, params=None):
+        for attempt in range(self.retries + 1):
+            await rate_limiter.wait()
+            self.requests += 1
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status not in retry_statuses or attempt == self.retries:
+                        response.raise_for_status()
+                        next_link = response.links.get('next')
+                        return (await response.json())['results'], next_link['url'] if next_link else None
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                retry_after = None
+            await asyncio.sleep(float(retry_after) if retry_after else min(2 ** attempt, 30) * random.uniform(0.5, 1))
+
+    # return all venues around a grid point; the next page URL already contains the parameters
+    async def get_point_venues(self, session, rate_limiter, point):
+        _, latitude, longitude = point
+        params = {'ll': f'{latitude},{longitude}', 'categories': str(self.category),
+                  'radius': str(self.radius), 'limit': str(self.limit)}
+        venues, next_url = await self._get_page(session, rate_limiter, self.url, params)
+        while next_url:
+            page_venues, next_url = await self._get_page(session, rate_limiter, next_url)
+            venues.extend(page_venues)
+        return venues
+
+    # crawl the grid points that are not finished in the checkpoint and return the deduplicated venues
+    async def crawl(self, points, checkpoint_path=None, progress=None):
+        deduplicator = VenueDeduplicator()
+        checkpoint = Checkpoint(checkpoint_path)
+        checkpoint.restore(deduplicator)
+        queue = asyncio.Queue()
+        for point in points:
+            if str(point[0]) not in checkpoint.finished_points:
+                queue.put_nowait(point)
+
+        rate_limiter = RateLimiter(self.requests_per_second)
+        headers = {'Accept': 'application/json', 'Authorization': self.api_key}
+
+        async def worker(session):
+            while not queue.empty():
+                point = queue.get_nowait()
+                venues = await self.get_point_venues(session, rate_limiter, point)
+                rows = [row for row in (get_venue_row(point, venue) for venue in venues) if row is not None]
+                checkpoint.save(str(point[0]), [row for row in rows if deduplicator.add(row)])
+                if progress is not None:
+                    progress(len(checkpoint.finished_points), len(deduplicator.venues))
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(headers=headers, connector=connector,
+                                         timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            workers = [asyncio.create_task(worker(session)) for _ in range(min(self.concurrency, queue.qsize()))]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+        return deduplicator.rows()
+
+
+# define a function that crawls the venues around the grid points from a script or a notebook;
+# in a notebook, where an event loop is already running, await GridCrawler(...).crawl(...) instead
+def crawl_venues(points, api_key, checkpoint_path=None, **crawler_options):
+    return asyncio.run(GridCrawler(api_key, **crawler_options).crawl(points, checkpoint_path))
+
+
+# define a function that writes the venues to a CSV file with the columns of the BigQuery table
+def write_venues_csv(rows, path):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=venue_columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl the Foursquare venues of a category around grid points, '
+                                                 'the API key is read from FSQ_API_KEY')
+    parser.add_argument('points', help='GeoJSON file of the grid points, or CSV with point_id, latitude, longitude')
+    parser.add_argument('output', help='CSV file of the unique venues')
+    parser.add_argument('--checkpoint', help='progress file, an interrupted crawl started again resumes from it; '
+                                             'by default <output>.checkpoint.jsonl')
+    parser.add_argument('--url', default=os.environ.get('FSQ_PLACES_URL', places_search_url))
+    parser.add_argument('--category', type=int, default=search_category)
+    parser.add_argument('--radius', type=int, default=search_radius)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests-per-second', type=float, default=40)
+    args = parser.parse_args()
+
+    points = read_grid_points(args.points)
+    started = time.perf_counter()
+
+    def progress(finished_points, venues):
+        print(f'\r{finished_points}/{len(points)} points, {venues} venues', end='', flush=True)
+
+    crawler = GridCrawler(os.environ.get('FSQ_API_KEY', ''), url=args.url, category=args.category,
+                          radius=args.radius, concurrency=args.concurrency,
+                          requests_per_second=args.requests_per_second)
+    rows = asyncio.run(crawler.crawl(points, args.checkpoint or f'{args.output}.checkpoint.jsonl', progress))
+    write_venues_csv(rows, args.output)
+    print(f'\n{len(rows)} unique venues written to {args.output}, '
+          f'{crawler.requests} requests in {time.perf_counter() - started:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import time
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# local stand-in of the Foursquare Places search endpoint, to run the crawler without an API key:
+# venues lie on a regular lattice around Brisbane, a search returns the venues within the radius
+# of the point, nearest first, in pages linked by the Link rel="next" header like the real API
+center_latitude = -27.47
+center_longitude = 153.02
+lattice_step = 0.004
+lattice_size = 250
+
+
+# define a function that returns the venue at a position of the lattice
+def get_lattice_venue(row, column):
+    latitude = center_latitude + (row - lattice_size / 2) * lattice_step
+    longitude = center_longitude + (column - lattice_size / 2) * lattice_step
+    return {'fsq_id': f'mock{row:04d}{column:04d}',
+            'name': f'Mock venue {row}-{column}',
+            'geocodes': {'main': {'latitude': round(latitude, 6), 'longitude': round(longitude, 6)}},
+            'location': {'address': f'{column} Mock Street', 'country': 'AU', 'locality': 'Brisbane',
+                         'postcode': f'{4000 + row % 200}', 'region': 'QLD',
+                         'formatted_address': f'{column} Mock Street, Brisbane QLD'}}
+
+
+# define a function that returns the venues within the radius in meters of a point, nearest first
+def search_venues(latitude, longitude, radius):
+    latitude_delta = radius / 111320
+    longitude_delta = radius / (111320 * math.cos(math.radians(latitude)))
+    rows = range(max(0, math.floor((latitude - latitude_delta - center_latitude) / lattice_step + lattice_size / 2)),
+                 min(lattice_size, math.ceil((latitude + latitude_delta - center_latitude) / lattice_step
+                                             + lattice_size / 2) + 1))
+    columns = range(max(0, math.floor((longitude - longitude_delta - center_longitude) / lattice_step
+                                      + lattice_size / 2)),
+                    min(lattice_size, math.ceil((longitude + longitude_delta - center_longitude) / lattice_step
+                                                + lattice_size / 2) + 1))
+    venues = []
+    for row in rows:
+        for column in columns:
+            venue = get_lattice_venue(row, column)
+            geocode = venue['geocodes']['main']
+            distance = math.hypot((geocode['latitude'] - latitude) * 111320,
+                                  (geocode['longitude'] - longitude) * 111320 * math.cos(math.radians(latitude)))
+            if distance <= radius:
+                venues.append((distance, venue))
+    venues.sort(key=lambda distance_venue: distance_venue[0])
+    return [venue for _, venue in venues]
+
+
+class PlacesHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/v3/places/search':
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.send_response(429)
+            self.send_header('Retry-After', '0.1')
+            self.end_headers()
+            return
+
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        latitude, longitude = map(float, query['ll'].split(','))
+        limit = int(query.get('limit', 10))
+        offset = int(query.get('cursor', 0))
+        venues = search_venues(latitude, longitude, float(query.get('radius', 1000)))
+
+        body = json.dumps({'results': venues[offset:offset + limit]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if offset + limit < len(venues):
+            next_query = urlencode(dict(query, cursor=offset + limit))
+            self.send_header('Link', f'<http://{self.headers["Host"]}{url.path}?{next_query}>; rel="next"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# define a function that writes a GeoJSON grid of points spacing meters apart over the lattice,
+# the input of the crawler
+def write_grid_points(path, spacing=6000):
+    latitude_step = spacing / 111320
+    longitude_step = spacing / (111320 * math.cos(math.radians(center_latitude)))
+    half_size = lattice_size / 2 * lattice_step
+    features = []
+    latitude = center_latitude - half_size
+    while latitude <= center_latitude + half_size:
+        longitude = center_longitude - half_size
+        while longitude <= center_longitude + half_size:
+            features.append({'type': 'Feature',
+                             'geometry': {'type': 'Point', 'coordinates': [round(longitude, 6), round(latitude, 6)]},
+                             'properties': {'id': len(features)}})
+            longitude += longitude_step
+        latitude += latitude_step
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file)
+    return len(features)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Foursquare Places search server, '
+                                                 'the crawler uses it with --url http://127.0.0.1:<port>/v3/places/search')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds before every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--write-grid', metavar='PATH', help='write a GeoJSON grid of points 6 km apart and exit')
+    args = parser.parse_args()
+
+    if args.write_grid:
+        print(f'{write_grid_points(args.write_grid)} points written to {args.write_grid}')
+        return
+    PlacesHandler.latency = args.latency
+    PlacesHandler.error_rate = args.error_rate
+    ThreadingHTTPServer(('127.0.0.1', args.port), PlacesHandler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()